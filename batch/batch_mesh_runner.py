@@ -0,0 +1,217 @@
+###############################################################################
+#  Resumable batch runs of the meshing scripts: every job (a parameter set of #
+# a sweep) runs in its own output folder and its state, inputs hash, outputs #
+# and timings are appended to a manifest. On restart, completed jobs are     #
+# skipped and failed/interrupted ones are retried (with a backoff and, after #
+# the first failure, with the job's lower-memory fallback settings)          #
+#                                                                             #
+#  Usage: python batch_mesh_runner.py jobs.json [--outdir DIR]               #
+#                                     [--max-attempts N] [--backoff SECONDS] #
+###############################################################################
+
+import argparse
+import copy
+import glob
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+#·# Inputs --------------------------------------------------------------------
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#Hard setting: Names of the manifest & report files (within the output folder)
+manifestfilename = 'batch_manifest.jsonl'
+reportfilename   = 'batch_report.json'
+#------------------------------------------------------------------------------
+
+
+#·# Def: recursively override the entries of a dict ------------------------------------
+def merge_dicts( base , overrides ):
+
+    merged = copy.deepcopy(base)
+    for key , value in overrides.items():
+        if isinstance(value,dict) and isinstance(merged.get(key),dict):
+            merged[key] = merge_dicts( merged[key] , value )
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: expand the jobs file (explicit jobs and/or a sweep over a base job) -------------
+def expand_jobs( jobs_spec ):
+
+    jobs = [ merge_dicts( jobs_spec.get("base",{}) , job ) for job in jobs_spec.get("jobs",[]) ]
+
+    #Sweep: cartesian product of the values of each "Section.key" of the parameters:
+    sweep = jobs_spec.get("sweep",{})
+    if len(sweep) > 0:
+        paths = list(sweep)
+        for values in itertools.product(*[sweep[path] for path in paths]):
+            overrides = {}
+            for path , value in zip(paths,values):
+                section , key = path.split('.')
+                overrides.setdefault(section,{})[key] = value
+            name = '_'.join( '{0}-{1}'.format(path.split('.')[1],value) for path,value in zip(paths,values) )
+            jobs.append( merge_dicts( jobs_spec["base"] , { "name" : name , "parameters" : overrides } ) )
+
+    names = [job["name"] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError('The job names must be unique')
+    return jobs
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: hash of the inputs of a job (parameters & content of the scripts, not the fallback)
+def inputs_hash( job ):
+
+    inputs = { key : job.get(key) for key in ["mesher","converter","parameters"] }
+    sha = hashlib.sha1( json.dumps(inputs,sort_keys=True).encode() )
+
+    #Content of the mesher, the converter and the shared modules (a fix reruns the jobs):
+    scripts = [ os.path.join(repo_dir,job[key]) for key in ["mesher","converter"] if job.get(key) is not None ]
+    scripts += sorted( glob.glob(os.path.join(repo_dir,'common','*.py')) )
+    for script in scripts:
+        with open(script,'rb') as f:
+            sha.update( f.read() )
+    return sha.hexdigest()
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: append a record to the manifest (one JSON object per line, flushed to disk) -----
+def append_record( manifestpath , record ):
+
+    record["timestamp"] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    with open(manifestpath,'a') as f:
+        f.write( json.dumps(record) + '\n' )
+        f.flush()
+        os.fsync(f.fileno())
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: latest record & number of attempts of every job in the manifest -----------------
+def read_manifest( manifestpath ):
+
+    latest , attempts = {} , {}
+    if not os.path.isfile(manifestpath):
+        return latest , attempts
+    with open(manifestpath) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError: #Line truncated by a crash while writing
+                continue
+            key = (record["job"],record["inputs_hash"])
+            latest[key] = record
+            if record["state"] == "running":
+                attempts[key] = attempts.get(key,0) + 1
+    return latest , attempts
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: run the meshing pipeline of a job in its folder, return outputs & timings -------
+def run_job( job , jobdir , timeout ):
+
+    #Start from an empty folder, so that only the outputs of this attempt are reported:
+    if os.path.isdir(jobdir):
+        shutil.rmtree(jobdir)
+    os.makedirs(jobdir)
+    parameters = copy.deepcopy(job["parameters"])
+    parameters.setdefault("General",{})["run_gui"] = False
+    with open(os.path.join(jobdir,job.get("parameters_file","specimen_parameters.json")),'w') as f:
+        json.dump(parameters,f,indent=1)
+
+    timings = {}
+    with open(os.path.join(jobdir,'batch_job.log'),'w') as log:
+        t0 = time.perf_counter()
+        subprocess.run( [sys.executable , os.path.join(repo_dir,job["mesher"])] , cwd=jobdir , check=True ,
+                        stdout=log , stderr=subprocess.STDOUT , timeout=timeout )
+        timings["mesher"] = time.perf_counter() - t0
+        if job.get("converter") is not None:
+            t0 = time.perf_counter()
+            subprocess.run( [sys.executable , os.path.join(repo_dir,job["converter"])] , cwd=jobdir , check=True ,
+                            input=parameters["General"]["output_file_name"]+'.msh\n' , text=True ,
+                            stdout=log , stderr=subprocess.STDOUT , timeout=timeout )
+            timings["converter"] = time.perf_counter() - t0
+
+    outputs = { name : os.path.getsize(os.path.join(jobdir,name)) for name in sorted(os.listdir(jobdir))
+                if os.path.splitext(name)[1] in ['.msh','.m'] }
+    return outputs , timings
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Parse command line & read the jobs ---------------------------------------------------
+parser = argparse.ArgumentParser(description='Resumable batch runs of the meshing scripts')
+parser.add_argument('jobsfile',help='JSON file with the jobs (see batch_jobs_model.json)')
+parser.add_argument('--outdir',default='batch_output',help='Output folder (one subfolder per job)')
+parser.add_argument('--max-attempts',type=int,default=3,help='Maximum number of attempts per job')
+parser.add_argument('--backoff',type=float,default=10.0,help='Base of the exponential retry backoff (s)')
+parser.add_argument('--timeout',type=float,default=None,help='Time limit of each script run (s)')
+args = parser.parse_args()
+
+with open(args.jobsfile) as f:
+    jobs = expand_jobs( json.load(f) )
+os.makedirs(args.outdir,exist_ok=True)
+manifestpath = os.path.join(args.outdir,manifestfilename)
+latest , attempts = read_manifest( manifestpath )
+
+
+#·# Run the jobs (skipping the completed ones) -------------------------------------------
+print('\n'+18*'-'+' {0} JOBS, MANIFEST: {1} '.format(len(jobs),manifestpath)+18*'-'+'\n')
+for job in jobs:
+    key = (job["name"],inputs_hash(job))
+
+    while True:
+        last = latest.get(key)
+        if last is not None and last["state"] == "completed":
+            print('[SKIP]  {0}: already completed'.format(job["name"]))
+            break
+        nattempt = attempts.get(key,0) + 1
+        if nattempt > args.max_attempts:
+            print('[GIVE UP] {0}: {1} attempts failed'.format(job["name"],args.max_attempts))
+            break
+
+        #Retries wait (exponential backoff) and use the lower-memory fallback, if any:
+        fallback = nattempt > 1 and "fallback" in job
+        run_spec = merge_dicts( job , job["fallback"] ) if fallback else job
+        if nattempt > 1:
+            time.sleep( args.backoff * 2**(nattempt-2) )
+
+        record = { "job" : job["name"] , "inputs_hash" : key[1] , "attempt" : nattempt , "fallback" : fallback }
+        append_record( manifestpath , dict(record,state="running") )
+        attempts[key] = nattempt
+        t0 = time.perf_counter()
+        try:
+            outputs , timings = run_job( run_spec , os.path.join(args.outdir,job["name"]) , args.timeout )
+        except (subprocess.CalledProcessError , subprocess.TimeoutExpired , OSError) as err:
+            latest[key] = dict(record,state="failed",error=str(err),timings={"total":time.perf_counter()-t0})
+            append_record( manifestpath , latest[key] )
+            print('[FAIL]  {0} (attempt {1}{2}): {3}'.format(job["name"],nattempt,', fallback' if fallback else '',err))
+            continue
+        timings["total"] = time.perf_counter() - t0
+        latest[key] = dict(record,state="completed",outputs=outputs,timings=timings)
+        append_record( manifestpath , latest[key] )
+        print('[DONE]  {0} (attempt {1}{2}, {3:.2f} s)'.format(job["name"],nattempt,', fallback' if fallback else '',timings["total"]))
+        break
+
+
+#·# Consolidated report (final state of every job of this jobs file) --------------------
+report = { "jobs" : [] , "summary" : { "completed" : 0 , "failed" : 0 , "pending" : 0 } }
+for job in jobs:
+    key   = (job["name"],inputs_hash(job))
+    last  = latest.get(key,{ "state" : "pending" })
+    state = last["state"] if last["state"] in ["completed","failed"] else "pending"
+    report["summary"][state] += 1
+    report["jobs"].append( { "job" : job["name"] , "state" : state , "attempts" : attempts.get(key,0) ,
+                             "fallback" : last.get("fallback",False) , "outputs" : last.get("outputs",{}) ,
+                             "timings" : last.get("timings",{}) , "error" : last.get("error") } )
+with open(os.path.join(args.outdir,reportfilename),'w') as f:
+    json.dump(report,f,indent=1)
+
+print('\n{completed} completed, {failed} failed, {pending} pending'.format(**report["summary"]) +
+      ' (report: {0})\n'.format(os.path.join(args.outdir,reportfilename)))
+sys.exit( 0 if report["summary"]["completed"] == len(jobs) else 1 )
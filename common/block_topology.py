@@ -0,0 +1,340 @@
+###############################################################################
+#  Declarative block-structured topologies of the specimens and their         #
+# compilation into either gmsh entities (transfinite surfaces) or a NumPy     #
+# structured quadrilateral mesh                                               #
+#                                                                             #
+#  A topology is a dict with:                                                 #
+#   "points"   : (npoints,3) array with the points coordinates                #
+#   "edges"    : (nedges,4) int array, Cols = [Startpt,Endpt,Centerpt,ndivs]  #
+#                (Centerpt = 0 for straight lines, ndivs = number of nodes)   #
+#   "blocks"   : list of arrays with the signed edge IDs of each block's loop #
+#   "variants" : dict with the block IDs meshed for each symmetry variant     #
+#  All the IDs start in 1 (same as the gmsh tags of the created entities).    #
+###############################################################################
+
+import numpy as np
+import math
+
+
+#-# Def: open-hole specimen topology ----------------------------------------- #
+def openhole_topology( total_width , hole_diam , grip_length , alpha_ratio ,
+                       nelem_transv , nelem_diag , nelem_long_holezone , nelem_long_grip ):
+
+    #(I)-POINTS DEFINITION:
+    npoints = 23
+    pcoords = np.zeros([npoints,3])
+
+    #Center point: stays in [0,0,0]
+    #Points 2 to 9 (on the hole):
+    theta_vect = math.atan2(1.0,alpha_ratio) * np.array([0,1,0,-1,0,1,0,-1]) + math.pi/2 * np.array([0,0,1,2,2,2,3,4])
+    pcoords[ np.arange(2,10)-1 , 0 ] = (hole_diam/2) * np.cos(theta_vect)
+    pcoords[ np.arange(2,10)-1 , 1 ] = (hole_diam/2) * np.sin(theta_vect)
+
+    #Points 10 to 17 (on the hole-zone boundary):
+    radius_vect = (alpha_ratio*total_width/2) * np.array([1,0,0,0,1,0,0,0]) + (total_width*math.sqrt(1+alpha_ratio**2)/2) * np.array([0,1,0,1,0,1,0,1]) + (total_width/2) * np.array([0,0,1,0,0,0,1,0])
+    pcoords[ np.arange(10,18)-1 , 0 ] = radius_vect * np.cos(theta_vect)
+    pcoords[ np.arange(10,18)-1 , 1 ] = radius_vect * np.sin(theta_vect)
+
+    #Points 18 to 23 (on the grip's boundaries):
+    pcoords[ np.arange(18,24)-1 , 0 ] = (alpha_ratio*total_width/2 + grip_length) * np.array([1,1,-1,-1,-1,1])
+    pcoords[ np.arange(18,24)-1 , 1 ] = (total_width/2) * np.array([0,1,1,0,-1,-1])
+
+    #(II)-EDGES DEFINITION (1-8 = hole arcs, 9-16 = hole-zone boundary, 17-24 = diagonals, 25-34 = grips):
+    #Cols = [Startpt,Endpt,Centerpt,division group]
+    edges = np.array([[ 2, 3,1,0],[ 3, 4,1,1],[ 4, 5,1,1],[ 5, 6,1,0],[ 6, 7,1,0],[ 7, 8,1,1],[ 8, 9,1,1],[ 9, 2,1,0],
+                      [10,11,0,0],[11,12,0,1],[12,13,0,1],[13,14,0,0],[14,15,0,0],[15,16,0,1],[16,17,0,1],[17,10,0,0],
+                      [ 2,10,0,2],[ 3,11,0,2],[ 4,12,0,2],[ 5,13,0,2],[ 6,14,0,2],[ 7,15,0,2],[ 8,16,0,2],[ 9,17,0,2],
+                      [10,18,0,3],[14,21,0,3],[18,19,0,0],[19,11,0,3],[13,20,0,3],[20,21,0,0],[21,22,0,0],[22,15,0,3],
+                      [17,23,0,3],[23,18,0,0]],dtype=int)
+
+    #Divisions for each group (transversal, hole-zone long, diagonal, grip-zone long):
+    ndivs_group = np.array([ int(nelem_transv/2) , int(nelem_long_holezone/2) , nelem_diag , nelem_long_grip ]) + 1
+    edges[:,3]  = ndivs_group[ edges[:,3] ]
+
+    #(III)-BLOCKS DEFINITION (signed edges of each curve loop):
+    blocks = [ np.array(blk) for blk in [ [ -1,17, 9,-18] , [ -2,18,10,-19] , [ -3,19,11,-20] , [ -4,20,12,-21] ,
+                                          [ -5,21,13,-22] , [ -6,22,14,-23] , [ -7,23,15,-24] , [ -8,24,16,-17] ,
+                                          [ -9,25,27, 28] , [-12,29,30,-26] , [-13,26,31, 32] , [-16,33,34,-25] ,
+                                          [ 17, 9,10,-19, -2, -1] , [ 19,11,12,-21, -4, -3] ,
+                                          [ 21,13,14,-23, -6, -5] , [ 23,15,16,-17, -8, -7] ] ]
+
+    #(IV)-SYMMETRY VARIANTS (blocks to be actually meshed):
+    variants = { "quarter" : np.array([1,2,9]) ,
+                 "half"    : np.array([1,2,7,8,9,12]) ,
+                 "whole"   : np.arange(1,13) ,
+                 "whole2"  : np.arange(9,17) }
+
+    return { "points" : pcoords , "edges" : edges , "blocks" : blocks , "variants" : variants }
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: dogbone specimen topology ------------------------------------------ #
+def dogbone_topology( total_width , gauge_width , gauge_length , fillet_radius , grip_length ,
+                      nelem_transv , nelem_long_gauge , nelem_long_fillet , nelem_long_grip ):
+
+    #Length of the fillet zone (tangent arc from the gauge width up to the grip width):
+    dy = (total_width - gauge_width)/2
+    if dy <= 0 or fillet_radius < dy:
+        raise ValueError('The dogbone requires gauge_width < total_width and fillet_radius >= (total_width-gauge_width)/2')
+    xf = gauge_length/2 + math.sqrt(fillet_radius**2 - (fillet_radius-dy)**2)
+    xe = xf + grip_length
+
+    #(I)-POINTS DEFINITION (upper-right quarter, point 9 = fillet center):
+    pcoords = np.zeros([9,3])
+    pcoords[:,0] = np.array([ 0 , gauge_length/2 , xf , xe , 0 , gauge_length/2 , xf , xe , gauge_length/2 ])
+    pcoords[:,1] = np.array([ 0 , 0 , 0 , 0 , gauge_width/2 , gauge_width/2 , total_width/2 , total_width/2 , gauge_width/2 + fillet_radius ])
+
+    #(II)-EDGES DEFINITION: Cols = [Startpt,Endpt,Centerpt,division group]
+    edges = np.array([[1,2,0,1],[2,3,0,2],[3,4,0,3],[1,5,0,0],[2,6,0,0],
+                      [3,7,0,0],[4,8,0,0],[5,6,0,1],[6,7,9,2],[7,8,0,3]],dtype=int)
+
+    #Divisions for each group (transversal, gauge long, fillet long, grip long):
+    ndivs_group = np.array([ int(nelem_transv/2) , int(nelem_long_gauge/2) , nelem_long_fillet , nelem_long_grip ]) + 1
+    edges[:,3]  = ndivs_group[ edges[:,3] ]
+
+    #(III)-BLOCKS DEFINITION (gauge, fillet and grip zones):
+    blocks = [ np.array([1,5,-8,-4]) , np.array([2,6,-9,-5]) , np.array([3,7,-10,-6]) ]
+
+    return mirror_quarter_topology( { "points" : pcoords , "edges" : edges , "blocks" : blocks } )
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: build the whole topology (and its variants) by mirroring a quarter - #
+def mirror_quarter_topology( quarter ):
+
+    #Quadrants (counterclockwise from the upper-right one):
+    quad_signs = np.array([[1,1],[-1,1],[-1,-1],[1,-1]])
+    npq , neq  = np.shape(quarter["points"])[0] , np.shape(quarter["edges"])[0]
+    tol        = 1e-9 * np.max(np.abs(quarter["points"]))
+
+    #Points: mirror and merge the ones lying on the symmetry axes (order of 1st appearance):
+    all_points = np.vstack([ quarter["points"] * np.array([sx,sy,1]) for sx,sy in quad_signs ])
+    _ , first_idx , inv_idx = np.unique( np.round(all_points/tol).astype(np.int64) , axis=0 ,
+                                         return_index=True , return_inverse=True )
+    rank   = np.argsort(np.argsort(first_idx))
+    pt_map = rank[inv_idx.ravel()] + 1 #Merged ID of each mirrored point
+    points = all_points[ np.sort(first_idx) ]
+
+    #Edges: remap to merged points and merge the ones lying on the symmetry axes:
+    all_edges = np.vstack([ quarter["edges"] for q in range(0,4) ])
+    offsets   = np.repeat(np.arange(0,4)*npq,neq)
+    all_edges[:,0] = pt_map[ all_edges[:,0]-1 + offsets ]
+    all_edges[:,1] = pt_map[ all_edges[:,1]-1 + offsets ]
+    all_edges[:,2] = np.where( all_edges[:,2] > 0 , pt_map[ np.maximum(all_edges[:,2]-1,0) + offsets ] , 0 )
+    keys = np.column_stack(( np.minimum(all_edges[:,0],all_edges[:,1]) , np.maximum(all_edges[:,0],all_edges[:,1]) , all_edges[:,2] ))
+    _ , first_idx , inv_idx = np.unique( keys , axis=0 , return_index=True , return_inverse=True )
+    rank    = np.argsort(np.argsort(first_idx))
+    edges   = all_edges[ np.sort(first_idx) ]
+    ed_map  = rank[inv_idx.ravel()] + 1
+    ed_sign = np.where( all_edges[:,0] == edges[ed_map-1,0] , 1 , -1 ) #Orientation w.r.t. the merged edge
+
+    #Blocks: remap edges; loops of the quadrants mirrored once are reversed (to keep them counterclockwise):
+    blocks = []
+    for q , (sx,sy) in enumerate(quad_signs):
+        for blk in quarter["blocks"]:
+            idx_ed = np.abs(blk)-1 + q*neq
+            loop   = np.sign(blk) * ed_sign[idx_ed] * ed_map[idx_ed]
+            blocks.append( loop if sx*sy > 0 else -loop[::-1] )
+
+    #Symmetry variants (quadrants 1 / 1,4 / all):
+    nbq = len(quarter["blocks"])
+    variants = { "quarter" : np.arange(1,nbq+1) ,
+                 "half"    : np.hstack(( np.arange(1,nbq+1) , np.arange(3*nbq+1,4*nbq+1) )) ,
+                 "whole"   : np.arange(1,4*nbq+1) }
+
+    return { "points" : points , "edges" : edges , "blocks" : blocks , "variants" : variants }
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: select the blocks of a variant and check the structured divisions -- #
+def compile_topology( topology , variant ):
+
+    if variant.lower() not in topology["variants"]:
+        raise ValueError('Unknown geometry type "{0}". Options: {1}'.format(variant,list(topology["variants"])))
+    block_ids = topology["variants"][variant.lower()]
+
+    #Opposite edges of 4-sided blocks must have the same number of divisions:
+    four_sided = [ bk for bk in block_ids if np.shape(topology["blocks"][bk-1])[0] == 4 ]
+    if len(four_sided) > 0:
+        loops = np.abs( np.array([ topology["blocks"][bk-1] for bk in four_sided ]) )
+        ndivs = topology["edges"][ loops-1 , 3 ]
+        if np.any( ndivs[:,0] != ndivs[:,2] ) or np.any( ndivs[:,1] != ndivs[:,3] ):
+            raise ValueError('Opposite edges of a structured block must have the same number of divisions')
+
+    return block_ids
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: create the gmsh entities (transfinite & recombined surfaces) ------- #
+def create_gmsh_entities( gmsh , topology , variant , transfinite=True ):
+
+    block_ids = compile_topology( topology , variant )
+    points , edges = topology["points"] , topology["edges"]
+
+    #Points:
+    pt_ids = np.array([ gmsh.model.geo.addPoint( points[pt,0] , points[pt,1] , points[pt,2] )
+                        for pt in range(0,np.shape(points)[0]) ],dtype=int)
+
+    #Edges (lines & circle arcs):
+    ed_ids = np.zeros(np.shape(edges)[0],dtype=int)
+    for ed in range(0,np.shape(edges)[0]):
+        if edges[ed,2] == 0:
+            ed_ids[ed] = gmsh.model.geo.addLine( pt_ids[edges[ed,0]-1] , pt_ids[edges[ed,1]-1] )
+        else:
+            ed_ids[ed] = gmsh.model.geo.addCircleArc( pt_ids[edges[ed,0]-1] , pt_ids[edges[ed,2]-1] , pt_ids[edges[ed,1]-1] )
+        if transfinite:
+            gmsh.model.geo.mesh.setTransfiniteCurve( ed_ids[ed] , edges[ed,3] )
+
+    #Curve loops (all blocks, so that the tags do not depend on the variant):
+    cl_ids = np.array([ gmsh.model.geo.addCurveLoop( (np.sign(blk)*ed_ids[np.abs(blk)-1]).tolist() )
+                        for blk in topology["blocks"] ],dtype=int)
+
+    #Surfaces to be actually meshed:
+    sf_ids = np.array([ gmsh.model.geo.addPlaneSurface([ cl_ids[bk-1] ]) for bk in block_ids ],dtype=int)
+    gmsh.model.geo.synchronize()
+
+    #Transfinite surfaces & recombine (unstructured meshers only need the bare entities):
+    if transfinite:
+        for sf in sf_ids:
+            gmsh.model.geo.mesh.setTransfiniteSurface(sf)
+            gmsh.model.geo.mesh.setRecombine(2, sf)
+
+    return sf_ids
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: nodes along an edge (uniform in length for lines, in angle for arcs) #
+def edge_nodes_coords( topology , edge_id , nnodes ):
+
+    start , end , center = topology["edges"][edge_id-1,:3]
+    p0 , p1 = topology["points"][start-1] , topology["points"][end-1]
+    param   = np.linspace(0,1,nnodes)[:,None]
+
+    if center == 0:
+        return p0 + param*(p1-p0)
+
+    pc = topology["points"][center-1]
+    theta0 = math.atan2( p0[1]-pc[1] , p0[0]-pc[0] )
+    dtheta = math.atan2( p1[1]-pc[1] , p1[0]-pc[0] ) - theta0
+    dtheta = (dtheta + math.pi) % (2*math.pi) - math.pi #Minor arc
+    radius = np.linalg.norm( p0[:2]-pc[:2] )
+    theta  = theta0 + param[:,0]*dtheta
+    return np.column_stack(( pc[0] + radius*np.cos(theta) , pc[1] + radius*np.sin(theta) , np.full(nnodes,p0[2]) ))
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: structured quad4/quad9 mesh of a variant (in-process, with NumPy) -- #
+def generate_structured_mesh( topology , variant , order ):
+
+    block_ids = compile_topology( topology , variant )
+    edges     = topology["edges"]
+
+    #Corner points of the meshed blocks get the first node IDs:
+    used_edges = np.unique( np.abs( np.hstack([ topology["blocks"][bk-1] for bk in block_ids ]) ) )
+    if any( np.shape(topology["blocks"][bk-1])[0] != 4 for bk in block_ids ):
+        raise ValueError('The NumPy structured generator only supports 4-sided blocks')
+    used_pts = np.unique( edges[used_edges-1,:2] )
+    pt_node  = np.zeros(np.shape(topology["points"])[0]+1,dtype=int)
+    pt_node[used_pts] = np.arange(1,np.shape(used_pts)[0]+1)
+    ncoords  = [ topology["points"][used_pts-1] ]
+    nnodes   = np.shape(used_pts)[0]
+
+    #Nodes along the edges (from start to end point):
+    edge_nodes = {}
+    for ed in used_edges:
+        nen = (edges[ed-1,3]-1)*order + 1
+        edge_nodes[ed] = np.hstack(( pt_node[edges[ed-1,0]] , nnodes + 1 + np.arange(nen-2) , pt_node[edges[ed-1,1]] ))
+        ncoords.append( edge_nodes_coords( topology , ed , nen )[1:-1] )
+        nnodes += nen - 2
+    ncoords = np.vstack(ncoords)
+
+    #Reference positions (gmsh ordering) of the element nodes within a (order+1)x(order+1) sub-grid:
+    ref = np.array([[0,0],[2,0],[2,2],[0,2],[1,0],[2,1],[1,2],[0,1],[1,1]])
+    if order == 1:
+        ref = ref[:4]//2
+
+    connect , block_tags , new_coords = [] , [] , [ ncoords ]
+    for bk in block_ids:
+        loop = topology["blocks"][bk-1]
+        side = [ edge_nodes[abs(ed)] if ed > 0 else edge_nodes[abs(ed)][::-1] for ed in loop ]
+        ns , nt = np.shape(side[0])[0] , np.shape(side[1])[0]
+
+        #Grid of node IDs: s along the 1st edge, t along the 2nd one (counterclockwise loop):
+        grid = np.zeros([ns,nt],dtype=int)
+        grid[:,0] , grid[-1,:] , grid[:,-1] , grid[0,:] = side[0] , side[1] , side[2][::-1] , side[3][::-1]
+        ninner = (ns-2)*(nt-2)
+        grid[1:-1,1:-1] = (nnodes + 1 + np.arange(ninner)).reshape(ns-2,nt-2)
+        nnodes += ninner
+
+        #Inner coordinates by transfinite (Coons) interpolation of the boundary nodes:
+        s = np.linspace(0,1,ns)[:,None,None]
+        t = np.linspace(0,1,nt)[None,:,None]
+        allc = np.vstack(new_coords)
+        B , R , T , L = allc[grid[:,0]-1][:,None,:] , allc[grid[-1,:]-1][None,:,:] , allc[grid[:,-1]-1][:,None,:] , allc[grid[0,:]-1][None,:,:]
+        X = (1-t)*B + t*T + (1-s)*L + s*R \
+            - ( (1-s)*(1-t)*allc[grid[0,0]-1] + s*(1-t)*allc[grid[-1,0]-1] + s*t*allc[grid[-1,-1]-1] + (1-s)*t*allc[grid[0,-1]-1] )
+
+        #Quadratic nodes inside the block lie on the straight edges of the linear grid (as with gmsh's setOrder(2)):
+        if order == 2:
+            X[1::2,0::2] = ( X[0:-1:2,0::2] + X[2::2,0::2] )/2
+            X[0::2,1::2] = ( X[0::2,0:-1:2] + X[0::2,2::2] )/2
+            X[1::2,1::2] = ( X[0:-1:2,0:-1:2] + X[2::2,0:-1:2] + X[2::2,2::2] + X[0:-1:2,2::2] )/4
+        new_coords.append( X[1:-1,1:-1].reshape(-1,3) )
+
+        #Elements connectivities (gmsh ordering):
+        I , J = np.meshgrid( np.arange(0,ns-1,order) , np.arange(0,nt-1,order) , indexing='ij' )
+        connect.append( grid[ I.ravel()[:,None] + ref[:,0] , J.ravel()[:,None] + ref[:,1] ] )
+        block_tags.append( np.full(np.shape(I)[0]*np.shape(I)[1],bk) )
+
+    return np.vstack(new_coords) , np.vstack(connect) , np.hstack(block_tags)
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: structured 2D mesh of a variant in the current gmsh model ----------- #
+#(generator = "gmsh": transfinite surfaces; "numpy": generate_structured_mesh loaded in bulk)
+def mesh_structured_2d( gmsh , topology , variant , order , generator="gmsh" ):
+
+    if generator == "numpy":
+
+        #Generate the structured mesh in-process and load it in bulk as a discrete surface:
+        ncoords , connect , _ = generate_structured_mesh( topology , variant , order )
+        gmsh.model.addDiscreteEntity( 2 , 1 )
+        gmsh.model.mesh.addNodes( 2 , 1 , np.arange(1,np.shape(ncoords)[0]+1) , ncoords.ravel() )
+        gmsh.model.mesh.addElementsByType( 1 , 3 if order == 1 else 10 , [] , connect.ravel() )
+        gmsh.model.addPhysicalGroup( 2 , [1] )
+
+    elif generator == "gmsh":
+
+        #Create entities, transfinite surfaces & recombine, and assign them a physical entity:
+        sf_ids = create_gmsh_entities( gmsh , topology , variant )
+        gmsh.model.addPhysicalGroup( 2 , sf_ids )
+        gmsh.model.geo.synchronize()
+
+        #Perform meshing:
+        gmsh.option.setNumber("Mesh.RecombineAll", 2)
+        gmsh.model.mesh.generate(2)
+        gmsh.model.mesh.setOrder( order )
+
+    else:
+        raise ValueError('Unknown generator "{0}". Options: "gmsh", "numpy"'.format(generator))
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: write the mesh of the current gmsh model and (optionally) run the GUI #
+def write_gmsh_mesh( gmsh , outfilename , run_gui=True ):
+
+    gmsh.option.setNumber('Mesh.SurfaceFaces', 1)
+    gmsh.option.setNumber('Mesh.Points', 1)
+    gmsh.write( outfilename )
+    if run_gui: #Set "run_gui": false for batch/CI runs
+        gmsh.fltk.run()
+
+#-# ------------------------------------------------------------------------- #
@@ -0,0 +1,86 @@
+###############################################################################
+#  Assembly-ready sparsity pattern of a mesh: CSR row pointers and column     #
+# indices (node or DOF level) and, for every element, the positions of its   #
+# element matrix entries in the CSR value array (scatter maps)               #
+#                                                                             #
+#  All the exported indices start in 1 (MATLAB), i.e. the columns of row "i"  #
+# are ColIdx(RowPtr(i):RowPtr(i+1)-1) and the entry (a,b) of the element     #
+# matrix of element "e" goes to Values(Scatter(e,(a-1)*nen+b)).              #
+###############################################################################
+
+import numpy as np
+
+
+#-# Def: node-level CSR pattern of one or more connectivity arrays ------------ #
+def compute_csr_pattern( connects , nnodes ):
+
+    #Every (row,col) pair of every element, as a single int64 key (node IDs start in 1):
+    keys = [ ((connect[:,:,None]-1)*np.int64(nnodes) + (connect[:,None,:]-1)).reshape(np.shape(connect)[0],-1)
+             for connect in connects ]
+    ukeys , inv_keys = np.unique( np.hstack([key.ravel() for key in keys]) , return_inverse=True )
+    inv_keys = inv_keys.ravel()
+
+    #Sorted unique keys are already row-major ordered, so they are the CSR value positions:
+    rows    = ukeys // nnodes
+    row_ptr = np.hstack(( 0 , np.cumsum( np.bincount(rows,minlength=nnodes) ) ))
+    col_idx = ukeys % nnodes
+
+    #Scatter maps of each connectivity array:
+    scatters , first = [] , 0
+    for key in keys:
+        scatters.append( inv_keys[first:first+np.size(key)].reshape(np.shape(key)) )
+        first += np.size(key)
+
+    return row_ptr , col_idx , scatters
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: expand a node-level pattern to "ndofs" DOFs per node (node-major) -- #
+def expand_csr_to_dofs( row_ptr , col_idx , scatters , connects , ndofs ):
+
+    nnodes   = np.shape(row_ptr)[0] - 1
+    row_nnz  = np.diff(row_ptr)
+    dofs     = np.arange(ndofs)
+
+    #DOF rows: row "n*ndofs+a" holds the DOFs of the columns of node row "n":
+    dof_row_ptr = np.hstack(( 0 , np.cumsum( np.repeat(row_nnz*ndofs,ndofs) ) ))
+    row_of_entry = np.repeat( np.arange(nnodes) , row_nnz )
+    offset       = np.arange(np.shape(col_idx)[0]) - row_ptr[row_of_entry] #Position of each entry within its node row
+    dof_col_idx  = np.zeros(np.shape(col_idx)[0]*ndofs**2 , dtype=np.int64)
+    for a in dofs:
+        pos = (dof_row_ptr[ row_of_entry*ndofs + a ] + offset*ndofs)[:,None] + dofs[None,:]
+        dof_col_idx[pos] = col_idx[:,None]*ndofs + dofs[None,:]
+
+    #Element scatter maps (local DOF "i*ndofs+a", entry (i*ndofs+a , j*ndofs+b)):
+    dof_scatters = []
+    for scatter , connect in zip(scatters,connects):
+        nelem , nen = np.shape(connect)
+        rows_i = (connect - 1)[:,:,None]                                                #Node row of (i,j)
+        offset = scatter.reshape(nelem,nen,nen) - row_ptr[rows_i]                       #(e,i,j)
+        start  = dof_row_ptr[ rows_i[:,:,:,None]*ndofs + dofs[None,None,None,:] ]       #(e,i,1,a)
+        pos    = start[:,:,:,:,None] + (offset*ndofs)[:,:,:,None,None] + dofs[None,None,None,None,:] #(e,i,j,a,b)
+        dof_scatters.append( pos.transpose(0,1,3,2,4).reshape(nelem,(nen*ndofs)**2) )
+
+    return dof_row_ptr , dof_col_idx , dof_scatters
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: write the pattern to an open MATLAB .m file (1-based indices) ------ #
+def write_csr_pattern( f , prefix , row_ptr , col_idx , scatters , scatter_names ):
+
+    f.write('\n{0}.RowPtr = [\n'.format(prefix))
+    np.savetxt( f , row_ptr + 1 , fmt='%d' )
+    f.write('];\n\n')
+
+    f.write('\n{0}.ColIdx = [\n'.format(prefix))
+    np.savetxt( f , col_idx + 1 , fmt='%d' )
+    f.write('];\n\n')
+
+    for scatter , name in zip(scatters,scatter_names):
+        f.write('\n{0}.{1} = [\n'.format(prefix,name))
+        np.savetxt( f , scatter + 1 , fmt='%d' )
+        f.write('];\n\n')
+
+#-# ------------------------------------------------------------------------- #
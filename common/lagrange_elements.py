@@ -0,0 +1,95 @@
+###############################################################################
+#  Reference nodes, shape functions & Jacobians of the (tensor-product)       #
+# Lagrange quadrilaterals and hexahedra used by the meshing scripts           #
+#                                                                             #
+#  The reference nodes are given in gmsh ordering; meshio.read returns the    #
+# hexahedron27 nodes in VTK ordering (meshio's "_gmsh_to_meshio_order"), so   #
+# the reference nodes of a meshio connectivity are ref_nodes_meshio[type].    #
+###############################################################################
+
+import numpy as np
+
+
+#-# Reference (gmsh ordering) nodal positions ------------------------------- #
+ref_nodes_gmsh = { "quad"  : np.array([[-1,-1],[1,-1],[1,1],[-1,1]]),
+                   "quad9" : np.array([[-1,-1],[1,-1],[1,1],[-1,1],[0,-1],[1,0],[0,1],[-1,0],[0,0]]),
+                   "hexahedron"   : np.array([[-1,-1,-1],[1,-1,-1],[1,1,-1],[-1,1,-1],
+                                              [-1,-1, 1],[1,-1, 1],[1,1, 1],[-1,1, 1]]),
+                   "hexahedron27" : np.array([[-1,-1,-1],[1,-1,-1],[1,1,-1],[-1,1,-1],
+                                              [-1,-1, 1],[1,-1, 1],[1,1, 1],[-1,1, 1],
+                                              [0,-1,-1],[-1,0,-1],[-1,-1,0],[1,0,-1],[1,-1,0],[0,1,-1],
+                                              [1,1,0],[-1,1,0],[0,-1,1],[-1,0,1],[1,0,1],[0,1,1],
+                                              [0,0,-1],[0,-1,0],[-1,0,0],[1,0,0],[0,1,0],[0,0,1],[0,0,0]]) }
+
+#meshio's gmsh-to-VTK permutation (meshio node "k" = gmsh node "gmsh_to_meshio[k]"), identity for the rest:
+gmsh_to_meshio = { "hexahedron27" : [0,1,2,3,4,5,6,7,8,11,13,9,16,18,19,17,10,12,14,15,22,23,21,24,20,25,26] }
+
+ref_nodes_meshio = { cell_type : ref[ gmsh_to_meshio.get(cell_type,np.arange(np.shape(ref)[0])) ]
+                     for cell_type , ref in ref_nodes_gmsh.items() }
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: shape functions & their derivatives at the points "xi" ------------- #
+def shape_functions( ref_coords , xi ):
+
+    npts , ndim = np.shape(xi)
+    npe   = np.shape(ref_coords)[0]
+    order = 1 if npe == 2**ndim else 2
+    nodes1d = np.linspace(-1,1,order+1)
+
+    #1D Lagrange polynomials (and derivatives) of every node, along every direction:
+    lag  = np.ones([npts,npe,ndim])
+    dlag = np.zeros([npts,npe,ndim])
+    for a in range(0,order+1):
+        others = np.delete(nodes1d,a)
+        denom  = np.prod( nodes1d[a] - others )
+        for d in range(0,ndim):
+            idx_a = ref_coords[:,d] == nodes1d[a]
+            lag[:,idx_a,d]  = ( np.prod( xi[:,d][:,None] - others[None,:] , axis=1 ) / denom )[:,None]
+            dlag[:,idx_a,d] = ( sum( np.prod( xi[:,d][:,None] - np.delete(others,k)[None,:] , axis=1 )
+                                     for k in range(0,order) ) / denom )[:,None]
+
+    #Tensor products:
+    shapefuncs = np.prod( lag , axis=2 )
+    derivs     = np.zeros([npts,npe,ndim])
+    for d in range(0,ndim):
+        derivs[:,:,d] = dlag[:,:,d] * np.prod( np.delete(lag,d,axis=2) , axis=2 )
+
+    return shapefuncs , derivs
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: Gauss-Legendre points & weights on the reference element ----------- #
+def gauss_points( ndim , npoints1d ):
+
+    pts1d , wts1d = np.polynomial.legendre.leggauss( npoints1d )
+    grid = np.array(np.unravel_index(np.arange(npoints1d**ndim),[npoints1d]*ndim)).T
+
+    return pts1d[grid] , np.prod( wts1d[grid] , axis=1 )
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: Jacobian determinants of every element at the points "xi" --------- #
+def jacobian_determinants( connect , ncoords , ref_coords , xi , chunk=100000 ):
+
+    ndim = np.shape(ref_coords)[1]
+    _ , derivs = shape_functions( ref_coords , xi )
+    dets = np.zeros([np.shape(connect)[0],np.shape(xi)[0]])
+
+    for first in range(0,np.shape(connect)[0],chunk): #Chunks bound the memory of the gathered coordinates
+        xyz = ncoords[ connect[first:first+chunk]-1 , :ndim ]              #(e,node,dim)
+        for pt in range(0,np.shape(xi)[0]):
+            jac = np.swapaxes(xyz,1,2) @ derivs[pt]                         #(e,dim,dim)
+            if ndim == 2:
+                dets[first:first+chunk,pt] = jac[:,0,0]*jac[:,1,1] - jac[:,0,1]*jac[:,1,0]
+            else:
+                dets[first:first+chunk,pt] = ( jac[:,0,0]*(jac[:,1,1]*jac[:,2,2] - jac[:,1,2]*jac[:,2,1])
+                                             - jac[:,0,1]*(jac[:,1,0]*jac[:,2,2] - jac[:,1,2]*jac[:,2,0])
+                                             + jac[:,0,2]*(jac[:,1,0]*jac[:,2,1] - jac[:,1,1]*jac[:,2,0]) )
+
+    return dets
+
+#-# ------------------------------------------------------------------------- #
@@ -0,0 +1,96 @@
+###############################################################################
+#  Layer-by-layer (streamed) extrusion of an in-plane quad4/quad9 mesh into  #
+# a laminate of hexa8/hexa27 elements, written straight to the MATLAB .m     #
+# output so that the peak memory is bounded by a single ply                  #
+###############################################################################
+
+import numpy as np
+
+
+#-# Extruded hexahedra in terms of the in-plane element (gmsh ordering) ------ #
+#Each hexa node = (node of the quad, through-the-thickness level within the element)
+hexa_from_quad = { 1 : { "quad_local" : np.array([0,1,2,3,0,1,2,3]) ,
+                         "level"      : np.array([0,0,0,0,1,1,1,1]) } ,
+                   2 : { "quad_local" : np.array([0,1,2,3,0,1,2,3,4,7,0,5,1,6,2,3,4,7,5,6,8,4,7,5,6,8,8]) ,
+                         "level"      : np.array([0,0,0,0,2,2,2,2,0,0,1,0,1,0,1,1,2,2,2,2,0,1,1,1,1,2,1]) } }
+
+#Nodes resorting indexes from the gmsh ordering (hexa8 kept in gmsh ordering). The hexa27 converter's
+#"idx_reord" acts on the meshio (VTK) ordering returned by meshio.read, so it is composed here with
+#meshio's gmsh-to-VTK permutation [0..8,11,13,9,16,18,19,17,10,12,14,15,22,23,21,24,20,25,26]:
+idx_reord = { 1 : np.arange(8) ,
+              2 : np.array([2,3,0,1,6,7,4,5,13,9,8,11,14,15,10,12,19,17,16,18,20,24,22,21,23,25,26]) }
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: node levels of every ply (a cohesive interface duplicates a level) - #
+def compute_ply_levels( elements_per_layer , order , cohesive_interfaces=() ):
+
+    ply_levels = []
+    last_level = 0
+    for lay in range(0,np.shape(elements_per_layer)[0]):
+        bottom = last_level + 1 if lay in cohesive_interfaces else last_level #Interface "i" is below ply "i" (0-based)
+        ply_levels.append( bottom + np.arange(elements_per_layer[lay]*order + 1) )
+        last_level = ply_levels[-1][-1]
+
+    return ply_levels
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: write the laminate mesh ply by ply --------------------------------- #
+def write_streamed_laminate( outfilename , ncoords2d , connect2d , order , thickness_per_layer ,
+                             elements_per_layer , z0 , ply_angles=None , cohesive_interfaces=() ):
+
+    nn2d     = np.shape(ncoords2d)[0]
+    nlayers  = np.shape(elements_per_layer)[0]
+    tables   = hexa_from_quad[order]
+    reord    = idx_reord[order]
+    ply_lvls = compute_ply_levels( elements_per_layer , order , cohesive_interfaces )
+    z_bottom = z0 + np.hstack(( 0 , np.cumsum(thickness_per_layer) ))
+    nelem    = 0
+
+    with open(outfilename,'w') as f:
+
+        #Connectivities (1st Column = Layer ID), one ply at a time:
+        f.write('\nMODEL.Conectivity = [\n')
+        for lay in range(0,nlayers):
+            for sub in range(0,elements_per_layer[lay]):
+                levels  = ply_lvls[lay][ sub*order + tables["level"] ]
+                connect = levels*nn2d + connect2d[:,tables["quad_local"]]
+                np.savetxt( f , np.column_stack(( np.full(np.shape(connect)[0],lay+1) , connect[:,reord] )) , fmt='%d' )
+                nelem += np.shape(connect)[0]
+        f.write('];\n\n')
+
+        #Coordinates, one level at a time:
+        f.write('\nMODEL.Coordinates = [\n')
+        for lay in range(0,nlayers):
+            z_levels = np.linspace( z_bottom[lay] , z_bottom[lay+1] , np.shape(ply_lvls[lay])[0] )
+            first    = 1 if (lay > 0 and lay not in cohesive_interfaces) else 0 #Bottom level already written
+            for z in z_levels[first:]:
+                np.savetxt( f , np.column_stack(( ncoords2d[:,:2] , np.full(nn2d,z) )) , fmt='%.17g' )
+        f.write('];\n\n')
+
+        #Material frames (one row per element, constant within each ply):
+        if ply_angles is not None:
+            f.write('\nMODEL.Orientation = [\n') #[Ply angle, R11, R12, R13, R21, R22, R23, R31, R32, R33]
+            nel2d = np.shape(connect2d)[0]
+            for lay in range(0,nlayers):
+                theta = np.deg2rad(ply_angles[lay])
+                row   = [ ply_angles[lay] , np.cos(theta) , np.sin(theta) , 0 , -np.sin(theta) , np.cos(theta) , 0 , 0 , 0 , 1 ]
+                np.savetxt( f , np.tile(row,(nel2d*elements_per_layer[lay],1)) , fmt='%.17g' )
+            f.write('];\n\n')
+
+        #Cohesive elements: [Interface ID, 9 lower-face nodes, 9 upper-face nodes]:
+        if len(cohesive_interfaces) > 0:
+            face_local = tables["quad_local"][reord][ tables["level"][reord] == 0 ] #Bottom-face nodes (resorted)
+            f.write('\nMODEL.Cohesive_Conectivity = [\n')
+            for itf in sorted(cohesive_interfaces):
+                lower = ply_lvls[itf-1][-1]*nn2d + connect2d[:,face_local]
+                upper = ply_lvls[itf][0]*nn2d    + connect2d[:,face_local]
+                np.savetxt( f , np.column_stack(( np.full(np.shape(lower)[0],itf) , lower , upper )) , fmt='%d' )
+            f.write('];\n\n')
+
+    return nelem , (ply_lvls[-1][-1]+1)*nn2d
+
+#-# ------------------------------------------------------------------------- #
@@ -0,0 +1,60 @@
+###############################################################################
+#  Script to create a structured two-dimensional mesh of a dogbone specimen   #
+# with either linear or quadratic quadrilateral elements (via gmsh or the     #
+# in-process NumPy generator) in terms of given geometry and mesh parameters  #
+###############################################################################
+
+import gmsh
+import numpy as np
+import json
+import os
+import sys
+
+#Shared block-topology engine:
+sys.path.append( os.path.join( os.path.dirname(os.path.abspath(__file__)) , '..' , '..' , 'common' ) )
+from block_topology import dogbone_topology , mesh_structured_2d , write_gmsh_mesh
+
+#·# Inputs --------------------------------------------------------------------
+#Hard setting: Name of the input file with the Specimen's Mesh and Geometry parameters
+inpfilename = 'specimen_parameters.json'
+#------------------------------------------------------------------------------
+
+
+
+#-# Read input file with specimen parameters:
+inpfile = open(inpfilename)  
+specimen_parameters = json.load(inpfile)  
+
+
+#-# Parse input data and calculate geometry data:
+geometry_parameters = specimen_parameters["Geometry"]
+mesh_parameters     = specimen_parameters["Mesh"]
+
+topology = dogbone_topology( geometry_parameters["total_width"] , geometry_parameters["gauge_width"] ,
+                             geometry_parameters["gauge_length"] , geometry_parameters["fillet_radius"] ,
+                             geometry_parameters["grip_length"] ,
+                             mesh_parameters["nelements_transv"] , mesh_parameters["nelements_long_gauge"] ,
+                             mesh_parameters["nelements_long_fillet"] , mesh_parameters["nelements_long_gripzone"])
+
+
+#-# Translate origin:
+topology["points"][:,0] += geometry_parameters["origin"][0] #Add X0
+topology["points"][:,1] += geometry_parameters["origin"][1] #Add Y0
+topology["points"][:,2] += geometry_parameters["origin"][2] #Add Z0
+
+
+#-# Initialize Geometric Model and Mesh Algorithm 
+gmsh.initialize()
+gmsh.option.setNumber("General.Terminal", 1)
+gmsh.model.add('Dogbone')
+
+
+#-# Structured mesh (gmsh transfinite surfaces or NumPy generator):
+mesh_structured_2d( gmsh , topology , geometry_parameters["type"] , mesh_parameters["elements_order"] ,
+                    mesh_parameters.get("generator","gmsh") )
+
+
+#-# Write mesh and run GUI
+write_gmsh_mesh( gmsh , specimen_parameters["General"]["output_file_name"]+'.msh' ,
+                 specimen_parameters["General"].get("run_gui",True) )
+gmsh.finalize()
@@ -0,0 +1,194 @@
+###############################################################################
+#  Script to create a periodic three-dimensional mesh of a unidirectional     #
+# fiber-reinforced micro-RVE (via gmsh) in terms of given geometry and mesh   #
+# parameters, exporting the periodic master/slave node pairs                  #
+###############################################################################
+
+import gmsh
+import numpy as np
+import json
+import sys
+
+original_stdout = sys.stdout #Original standard output
+
+#-# Inputs --------------------------------------------------------------------
+#Hard setting: Name of the input file with the RVE's Mesh and Geometry parameters
+inpfilename = 'rve_parameters.json'
+#------------------------------------------------------------------------------
+
+
+#-# Def: function to pair the nodes on opposite boundaries of the RVE -------- #
+def compute_periodic_node_pairs( ncoords , rve_min , rve_size , tol ):
+
+    #Boundary flags for each direction (rows = nodes, cols = X,Y,Z):
+    rve_min  = np.asarray(rve_min,dtype=float)
+    rve_max  = rve_min + np.asarray(rve_size,dtype=float)
+    on_min   = np.abs(ncoords - rve_min) < tol
+    on_max   = np.abs(ncoords - rve_max) < tol
+    nbounds  = np.sum(on_min | on_max, axis=1) #1 = face, 2 = edge, 3 = corner
+    node_ids = np.arange(1,np.shape(ncoords)[0]+1)
+    keys     = np.round( ncoords / tol ).astype(np.int64) #Tolerance-based integer coordinates
+    dirnames = ['X','Y','Z']
+
+    #Pair two node sets by sorting them on the coordinates along the given axes:
+    def match( idx_master , idx_slave , axes ):
+        master = node_ids[idx_master][ np.lexsort( keys[idx_master][:,axes[::-1]].T ) ]
+        slave  = node_ids[idx_slave][ np.lexsort( keys[idx_slave][:,axes[::-1]].T ) ]
+        if np.shape(master) != np.shape(slave) or \
+           np.any( np.abs( ncoords[master-1][:,axes] - ncoords[slave-1][:,axes] ) > tol ):
+            raise ValueError('The mesh is not periodic: opposite boundaries have non-matching nodes')
+        return np.column_stack((master,slave))
+
+    pairs = {}
+
+    #Faces (master = min face, slave = max face; edges and corners excluded):
+    for d in range(0,3):
+        axes = [a for a in range(0,3) if a != d]
+        pairs['Face_'+dirnames[d]] = match( (nbounds==1) & on_min[:,d] , (nbounds==1) & on_max[:,d] , axes )
+
+    #Edges parallel to each direction (master = edge at the min-min position):
+    for d in range(0,3):
+        a , b = [a for a in range(0,3) if a != d]
+        idx_edge = (nbounds==2) & ~(on_min[:,d] | on_max[:,d])
+        master   = idx_edge & on_min[:,a] & on_min[:,b]
+        pairs['Edge_'+dirnames[d]] = np.vstack(( match( master , idx_edge & on_max[:,a] & on_min[:,b] , [d] ) ,
+                                                 match( master , idx_edge & on_max[:,a] & on_max[:,b] , [d] ) ,
+                                                 match( master , idx_edge & on_min[:,a] & on_max[:,b] , [d] ) ))
+
+    #Corners (master = corner at the min-min-min position):
+    idx_corner = np.flatnonzero(nbounds==3)
+    corner_code = on_max[idx_corner].astype(int) @ np.array([1,2,4])
+    if np.shape(idx_corner)[0] != 8 or np.shape(np.unique(corner_code))[0] != 8:
+        raise ValueError('The mesh is not periodic: the RVE corners were not found')
+    corners = node_ids[idx_corner][ np.argsort(corner_code) ]
+    pairs['Corner'] = np.column_stack(( np.full(7,corners[0]) , corners[1:] ))
+
+    return pairs
+
+#-# ------------------------------------------------------------------------- #
+
+
+
+
+#-# Read input file with RVE parameters ------------------------------------- #
+inpfile = open(inpfilename)
+rve_parameters = json.load(inpfile)
+
+
+
+
+#-# Parse input data -------------------------------------------------------- #
+geometry_parameters = rve_parameters["Geometry"]
+mesh_parameters     = rve_parameters["Mesh"]
+
+rve_min  = np.array(geometry_parameters["origin"],dtype=float) #Min corner of the RVE
+rve_size = np.array(geometry_parameters["size"],dtype=float)   #RVE's edge lengths [Lx,Ly,Lz]
+fib_rad  = geometry_parameters["fiber_radius"]                 #Fibers radius
+fib_cent = np.array(geometry_parameters["fiber_centers"],dtype=float).reshape(-1,2) #Fibers (X,Y) centers
+tol      = 1e-6 * np.max(rve_size)                             #Geometric tolerance
+
+
+
+
+#-# Initialize Geometric Model and Mesh Algorithm --------------------------- #
+gmsh.initialize()
+gmsh.option.setNumber("General.Terminal", 1)
+gmsh.model.add('MicroRVE')
+
+
+
+
+#-# Create the matrix box and the fibers (running along Z) ------------------- #
+box_id = gmsh.model.occ.addBox( rve_min[0] , rve_min[1] , rve_min[2] , rve_size[0] , rve_size[1] , rve_size[2] )
+
+frag_map = [ [(3,box_id)] ]
+if np.shape(fib_cent)[0] > 0:
+    #Fibers crossing the RVE's boundaries must be given together with their periodic images:
+    cyl_dimtags = [ (3 , gmsh.model.occ.addCylinder( fib_cent[fb,0] , fib_cent[fb,1] , rve_min[2] , 0 , 0 , rve_size[2] , fib_rad ))
+                    for fb in range(0,np.shape(fib_cent)[0]) ]
+    box_copy    = gmsh.model.occ.copy([(3,box_id)])
+    fib_dimtags , _ = gmsh.model.occ.intersect( cyl_dimtags , box_copy ) #Trim fibers to the RVE
+
+    #Make the matrix and the fibers conforming:
+    _ , frag_map = gmsh.model.occ.fragment( [(3,box_id)] , fib_dimtags )
+gmsh.model.occ.synchronize()
+
+fib_vols = [dt[1] for fmap in frag_map[1:] for dt in fmap]
+mat_vols = [dt[1] for dt in frag_map[0] if dt[1] not in fib_vols]
+
+#Physical groups (0 = matrix, 1 = fibers):
+gmsh.model.addPhysicalGroup( 3 , mat_vols , 0 )
+if len(fib_vols) > 0:
+    gmsh.model.addPhysicalGroup( 3 , fib_vols , 1 )
+
+
+
+
+#-# Set periodicity between opposite faces (master = min face) ------------- #
+for d in range(0,3):
+
+    #Affine transformation (translation along direction d):
+    translation = np.eye(4)
+    translation[d,3] = rve_size[d]
+
+    #Surfaces on the min face:
+    bbox_min = np.hstack(( rve_min - tol , rve_min + rve_size + tol ))
+    bbox_min[3+d] = rve_min[d] + tol
+    master_sfs = gmsh.model.getEntitiesInBoundingBox( *bbox_min , dim=2 )
+
+    for (_ , msf) in master_sfs:
+        #Look for the translated copy of the master surface on the max face:
+        bbox_m = np.array( gmsh.model.getBoundingBox(2,msf) )
+        bbox_m[[d,3+d]] += rve_size[d]
+        candidates = gmsh.model.getEntitiesInBoundingBox( *(bbox_m + tol*np.array([-1,-1,-1,1,1,1])) , dim=2 )
+        for (_ , ssf) in candidates:
+            if np.all( np.abs( np.array(gmsh.model.getBoundingBox(2,ssf)) - bbox_m ) < tol ):
+                gmsh.model.mesh.setPeriodic( 2 , [ssf] , [msf] , translation.ravel().tolist() )
+                break
+
+
+
+
+#-# Perform meshing --------------------------------------------------------- #
+gmsh.option.setNumber("Mesh.MeshSizeMin", mesh_parameters["element_size"])
+gmsh.option.setNumber("Mesh.MeshSizeMax", mesh_parameters["element_size"])
+gmsh.model.mesh.generate(3)
+gmsh.model.mesh.setOrder( mesh_parameters["elements_order"] )
+gmsh.model.mesh.renumberNodes()    #Node tags = 1...nnodes
+gmsh.model.mesh.renumberElements()
+
+
+
+
+#-# Compute the periodic node pairs ------------------------------------------ #
+node_tags , node_coords , _ = gmsh.model.mesh.getNodes()
+ncoords = np.zeros([np.shape(node_tags)[0],3])
+ncoords[node_tags.astype(int)-1,:] = node_coords.reshape(-1,3)
+
+periodic_pairs = compute_periodic_node_pairs( ncoords , rve_min , rve_size , tol )
+
+
+
+
+#-# Write outputs (.msh and .m files) and run GUI --------------------------- #
+gmsh.option.setNumber('Mesh.SurfaceFaces', 1)
+gmsh.option.setNumber('Mesh.Points', 1)
+gmsh.write( rve_parameters["General"]["output_file_name"]+'.msh' )
+
+print('\nWriting MATLAB .m file: Periodic_Node_Pairs.m , wait...\n')
+with open('Periodic_Node_Pairs.m','w') as f:
+    sys.stdout = f #Change the standard output to the file created
+
+    np.set_printoptions( threshold=sys.maxsize , linewidth=1e3)
+
+    for name in periodic_pairs: #Cols = [Master node, Slave node]
+        print('\nMODEL.Periodic.{0} = ...'.format(name))
+        print(periodic_pairs[name])
+        print(';\n')
+
+sys.stdout = original_stdout
+print('\nDone writing Periodic_Node_Pairs.m\n')
+
+if rve_parameters["General"].get("run_gui",True): #Set "run_gui": false for batch/CI runs
+    gmsh.fltk.run()
+gmsh.finalize()
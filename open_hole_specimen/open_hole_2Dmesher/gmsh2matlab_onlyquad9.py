@@ -6,9 +6,19 @@
 
 import numpy as np                                                        
 import meshio                                     
+import json
+import os
 import sys                                          
                                                     
 original_stdout = sys.stdout #Get Original standard output                    
+
+#Assembly-ready sparsity pattern (shared with the 3D converter):
+sys.path.append( os.path.join( os.path.dirname(os.path.abspath(__file__)) , '..' , '..' , 'common' ) )
+from csr_pattern import compute_csr_pattern , expand_csr_to_dofs , write_csr_pattern
+
+#Hard setting: Name of the input file with the Specimen's Mesh parameters (optional, only
+#read for the CSR sparsity pattern: "csr_pattern" & "dofs_per_node" of the "Mesh" section)
+inpfilename = 'specimen_parameters.json'
                                                     
                                    
 #·# PARSE INPUT DATA ----------------------------------------------------------
@@ -31,6 +41,23 @@ connectivities[:,0]  = 1  #1st Column = Material ID
 connectivities[:,1:] = true_con[:,resortidx]   #connectivities (w/Reordering)
 
 
+#·# CSR SPARSITY PATTERN (optional) -------------------------------------------
+csr_export    = False
+dofs_per_node = None
+if os.path.isfile(inpfilename):
+    with open(inpfilename) as inpfile:
+        mesh_parameters = json.load(inpfile)["Mesh"]
+    csr_export    = mesh_parameters.get("csr_pattern",False)
+    dofs_per_node = mesh_parameters.get("dofs_per_node")
+
+if csr_export:
+    csr_connects = [ true_con[:,resortidx].astype(np.int64) ]
+    row_ptr , col_idx , scatters = compute_csr_pattern( csr_connects , np.shape(ncoords)[0] )
+    if dofs_per_node is not None:
+        dof_row_ptr , dof_col_idx , dof_scatters = expand_csr_to_dofs( row_ptr , col_idx , scatters , csr_connects , dofs_per_node )
+    print('\n'+18*'-'+' CSR PATTERN: {0} NODAL NONZEROS '.format(np.shape(col_idx)[0])+18*'-'+'\n')
+
+
 #·# WRITE OUTPUT (.txt file)
 print('\nWriting .m file: Connectivities_and_Coordinates_2D.m , wait...\n')
 with open('Connectivities_and_Coordinates_2D.m','w') as f:
@@ -45,6 +72,11 @@ with open('Connectivities_and_Coordinates_2D.m','w') as f:
     print('\nMACRO_MODEL.Coordinates = ...')
     print(ncoords)
     print(';\n')
+
+    if csr_export:
+        write_csr_pattern( f , 'MACRO_MODEL.CSR' , row_ptr , col_idx , scatters , ['Scatter'] )
+        if dofs_per_node is not None:
+            write_csr_pattern( f , 'MACRO_MODEL.CSR_DOF' , dof_row_ptr , dof_col_idx , dof_scatters , ['Scatter'] )
     
     # print("MACRO_MODEL.Conectivity = [ (1:size(MACRO_MODEL.Conectivity,1))' MACRO_MODEL.Conectivity ];\n")
     #print("MACRO_MODEL.Coordinates = [ (1:size(MACRO_MODEL.Coordinates,1))' MACRO_MODEL.Coordinates ];\n")
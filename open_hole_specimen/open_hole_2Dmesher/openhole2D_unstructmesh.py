@@ -1,223 +1,211 @@
+###############################################################################
+#  Script to create an unstructured two-dimensional mesh of an open-hole      #
+# specimen with either linear or quadratic quadrilateral elements (via gmsh)  #
+# in terms of the same geometry & mesh parameters as the structured mesher,  #
+# plus the element sizes and the 2D meshing/recombination algorithms. In     #
+# tuning mode, the algorithms are selected on a coarse proxy of the mesh.    #
+###############################################################################
+
 import gmsh
 import numpy as np
-import math
+import hashlib
+import json
+import os
+import sys
+import time
+
+#Shared block-topology engine:
+sys.path.append( os.path.join( os.path.dirname(os.path.abspath(__file__)) , '..' , '..' , 'common' ) )
+from block_topology import openhole_topology , create_gmsh_entities , write_gmsh_mesh
 
 #·# Inputs --------------------------------------------------------------------
-#·# Specimen Geometry parameters:
-X0 = 0      #
-Y0 = 0      #
-Z0 = 0      #
-total_width  = 500   #Specimen's grip (total) width 
-hole_diam    = 250 #Hole diameter (Always located at the geom center of the specimen)
-grip_length  = 250   #Specimen's total length
-alpha_ratio  = 1.0  #Grip to Hole-Zone lengths ratio  
-geom_type    = 'Quarter' #Options: "Quarter","Half","Whole"
-
-#·# Discretization parameters:
-nelem_transv = 70#40#
-nelem_diag   = 45#25#
-nelem_long_holezone = 80#40
-nelem_long_grip     = 30#20#
+#Hard setting: Name of the input file with the Specimen's Mesh and Geometry parameters
+inpfilename = 'specimen_parameters.json'
+#Hard setting: Name of the file caching the tuned algorithms of each parameter family
+cachefilename = 'unstructmesh_tuning_cache.json'
 #------------------------------------------------------------------------------
 
-     
-def get_geometry_data(geometry_type):
-    
-    #(I)-POINTS DEFINITION:
-    npoints = 23
-    pcoords = np.zeros([npoints,3])
-    #idx_xy = np.array([0,1]) #dummy index for x and y coords
-    
-    #Center point: stays in [0,0,0]
-    #Points 2 to 9 (on the hole):
-    theta_vect = math.atan2(1.0,alpha_ratio) * np.array([0,1,0,-1,0,1,0,-1]) + math.pi/2 * np.array([0,0,1,2,2,2,3,4]) 
-    pcoords[ np.arange(2,10)-1 , 0 ] = (hole_diam/2) * np.cos(theta_vect)
-    pcoords[ np.arange(2,10)-1 , 1 ] = (hole_diam/2) * np.sin(theta_vect)
-    
-    #Points 10 to 17 (on the hole-zone boundary):
-    radius_vect = (alpha_ratio*total_width/2) * np.array([1,0,0,0,1,0,0,0]) + (total_width*math.sqrt(1+alpha_ratio**2)/2) * np.array([0,1,0,1,0,1,0,1]) + (total_width/2) * np.array([0,0,1,0,0,0,1,0])
-    pcoords[ np.arange(10,18)-1 , 0 ] = radius_vect * np.cos(theta_vect)
-    pcoords[ np.arange(10,18)-1 , 1 ] = radius_vect * np.sin(theta_vect)
-            
-    #Points 18 to 23 (on the grip's boundaries):
-    pcoords[ np.arange(18,24)-1 , 0 ] = (alpha_ratio*total_width/2 + grip_length) * np.array([1,1,-1,-1,-1,1])
-    pcoords[ np.arange(18,24)-1 , 1 ] = (total_width/2) * np.array([0,1,1,0,-1,-1])
-    
-    #(II)-CIRCLE ARCS DEFINITION:
-    ncirclearcs = 8
-    #ca_ids      = np.zeros(ncirclearcs,dtype=int)
-    ca_conect   = np.zeros([ncirclearcs,4],dtype=int) #Cols = [Startpt,Centerpt,Endpt,ndivisions] 
-    #Connectivities:
-    for i in range(1,8):
-        ca_conect[i-1,np.array([0,1,2])] = np.array([i+1,1,i+2]) 
-    ca_conect[7,np.array([0,1,2])] = np.array([8+1,1,2]) #8thCA
-    #Divisions:
-    ca_conect[ np.array([1,4,5,8])-1 , 3 ] = (nelem_transv/2) + 1  
-    ca_conect[ np.array([2,3,6,7])-1 , 3 ] = (nelem_long_holezone/2) + 1   
-    
-    #(II)-LINES DEFINITION:
-    nlines = 26
-    ln_conect = np.zeros([nlines,3],dtype=int) #Cols = [Startpt,Endpt,ndivisions] 
-    
-    #Connectivities Lines 1 to 8:
-    i = np.arange(1,8)
-    ln_conect[ i-1 , 0 ] = i + 9
-    ln_conect[ i-1 , 1 ] = i + 10
-    i = 8
-    ln_conect[ i-1 , 0 ] = i + 9
-    ln_conect[ i-1 , 1 ] = 10
-    
-    #Connectivities Lines 9 to 16:
-    i = np.arange(9,17)
-    ln_conect[ i-1 , 0 ] = i - 7
-    ln_conect[ i-1 , 1 ] = i + 1
-    
-    #Conectivities Lines 17 to 26:
-    i = np.arange(17,27)
-    ln_conect[ i-1 , 0 ] = np.array([10,14,18,19,13,20,21,22,17,23],dtype=int)
-    ln_conect[ i-1 , 1 ] = np.array([18,21,19,11,20,21,22,15,23,18],dtype=int)
-    
-    #Lines Divisions:
-    idx_transvln = np.array([1,4,5,8,19,22,23,26])  #Transversal lines
-    idx_hzlongln = np.array([2,3,6,7])              #Hole-zone long lines
-    idx_diagln   = np.arange(9,17)                  #Diagonal lines
-    idx_glongln  = np.array([17,18,20,21,24,25])    #Grip-zone long lines
-    ln_conect[ idx_transvln-1 , 2 ] = (nelem_transv/2) + 1
-    ln_conect[ idx_hzlongln-1 , 2 ] = (nelem_long_holezone/2) + 1
-    ln_conect[ idx_diagln-1 , 2 ]   = nelem_diag + 1
-    ln_conect[ idx_glongln-1 , 2 ]  = nelem_long_grip + 1
-    
-        
-    #(III)-CURVE LOOPS DEFINITIONS:
-    ncloops   = 16
-        
-    #Curve-Loops conectivity: list where each element is a numpy array w/the conectivities of 
-    #the respective curve loop. 2nd dim is type of the geom entity (0=line,1=circe_arc)
-    #Cls 1 to 7:
-    cl_conect = []
-    for i in range(1,8):
-        cl_conect.append({ 'geometry_types': np.array([  2 ,  1  , 1 ,   1   ]),
-                           'entities_ids':   np.array([  i , i+8 , i , 8+i+1 ]),
-                           'signs':          np.array([ -1 ,  1  , 1 ,  -1   ])
-                         })
-    #Cl 8:
-    for i in range(8,9):
-        cl_conect.append({ 'geometry_types': np.array([  2 ,  1  , 1 ,   1   ]),
-                           'entities_ids':   np.array([  i , i+8 , i ,  8+1 ]),
-                           'signs':          np.array([ -1 ,  1  , 1 ,  -1   ])
-                         })
-    #Cls 9 to 12:
-    aux_conect = np.vstack(( np.array([-1,17,19,20]) , np.array([-4,21,22,-18]) , np.array([-5,18,23,24]) , np.array([-8,25,26,-17]) ))
-    for i in range(0,4):        
-        cl_conect.append({ 'geometry_types': np.ones(np.shape(aux_conect)[1],dtype='int'),
-                           'entities_ids':   np.abs(aux_conect[i,:],dtype='int'),
-                           'signs':          np.sign(aux_conect[i,:],dtype='int')
-                         })
-    #Additional CLs (13 to 16): 
-    cl_conect.append({ 'geometry_types': np.array([ 1 , 1 , 1 ,  1 ,  2 ,  2 ]),
-                       'entities_ids'  : np.array([ 9 , 1 , 2 , 11 ,  2 ,  1 ]),
-                       'signs'         : np.array([ 1 , 1 , 1 , -1 , -1 , -1 ])})
-     
-    cl_conect.append({ 'geometry_types': np.array([  1 , 1 , 1 ,  1 ,  2 ,  2 ]),
-                       'entities_ids'  : np.array([ 11 , 3 , 4 , 13 ,  4 ,  3 ]),
-                       'signs'         : np.array([  1 , 1 , 1 , -1 , -1 , -1 ])})
-    
-    cl_conect.append({ 'geometry_types': np.array([  1 , 1 , 1 ,  1 ,  2 ,  2 ]),
-                       'entities_ids'  : np.array([ 13 , 5 , 6 , 15 ,  6 ,  5 ]),
-                       'signs'         : np.array([  1 , 1 , 1 , -1 , -1 , -1 ])})
-    
-    cl_conect.append({ 'geometry_types': np.array([  1 , 1 , 1 ,  1 ,  2 ,  2 ]),
-                       'entities_ids'  : np.array([ 15 , 7 , 8 ,  9 ,  8 ,  7 ]),
-                       'signs'         : np.array([  1 , 1 , 1 , -1 , -1 , -1 ])})
-    
-    #(IV)-DEFINE SURFACES TO BE ACTUALLY MESHED:
-    if geometry_type == 'Quarter' or geom_type == 'quarter':
-        sf_connect = np.array([1,2,9],dtype='int') 
-    elif geometry_type == 'Half' or geom_type == 'half':
-        sf_connect = np.array([1,2,7,8,9,12])
-    elif geometry_type == 'Whole' or geom_type == 'whole':
-        sf_connect = np.arange(1,13,dtype='int')
-    elif geometry_type == 'Whole2' or geom_type == 'whole':
-        sf_connect = np.arange(9,17,dtype='int')
-    nsurfs = np.shape(sf_connect)[0]
-    
-    
-    return npoints , pcoords , ncirclearcs , ca_conect , nlines , ln_conect , ncloops , cl_conect , nsurfs , sf_connect
-        
-
-    
-    
-npoints , pcoords , ncirclearcs , ca_conect , nlines , ln_conect , ncloops , cl_conect , nsurfs , sf_connect = get_geometry_data(geom_type)
-        
-pcoords[:,0] += X0
-pcoords[:,1] += Y0
-pcoords[:,2] += Z0
-
-
-#·# Initiate Geometric Model and Mesh Algorithm 
+
+#·# gmsh codes of the 2D meshing ("Mesh.Algorithm") & recombination ("Mesh.RecombinationAlgorithm") algorithms:
+algorithms     = { "meshadapt" : 1 , "automatic" : 2 , "delaunay" : 5 , "frontal-delaunay" : 6 ,
+                   "frontal-delaunay-quads" : 8 , "packing-parallelograms" : 9 }
+recombinations = { "simple" : 0 , "blossom" : 1 , "simple-full-quad" : 2 , "blossom-full-quad" : 3 }
+
+#·# Default tuning settings (candidate pairs, coarsening of the proxy mesh & minimum quality):
+tuning_defaults = { "tuning_algorithms"     : ["frontal-delaunay","frontal-delaunay-quads","packing-parallelograms","delaunay"] ,
+                    "tuning_recombinations" : ["blossom","simple","blossom-full-quad","simple-full-quad"] ,
+                    "tuning_coarsening"     : 4.0 ,
+                    "min_quality"           : 0.3 }
+
+
+#·# Def: set the element sizes (on the geometry points) -------------------------------------
+def set_mesh_sizes( topology , element_size , hole_element_size ):
+
+    on_hole = np.zeros(np.shape(topology["points"])[0],dtype=bool)
+    on_hole[ topology["edges"][ topology["edges"][:,2] != 0 , :2 ].ravel() - 1 ] = True #Circle-arc end points
+    gmsh.model.mesh.setSize( [(0,pt+1) for pt in np.flatnonzero(~on_hole)] , element_size )
+    gmsh.model.mesh.setSize( [(0,pt+1) for pt in np.flatnonzero(on_hole)]  , hole_element_size )
+    gmsh.option.setNumber("Mesh.MeshSizeMax", max(element_size,hole_element_size))
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: mesh (linear elements) with a given pair of algorithms, return time & stats -------
+def mesh_with( algorithm , recombination ):
+
+    gmsh.model.mesh.clear()
+    gmsh.option.setNumber("Mesh.Algorithm", algorithms[algorithm])
+    gmsh.option.setNumber("Mesh.RecombinationAlgorithm", recombinations[recombination])
+    gmsh.option.setNumber("Mesh.RecombineAll", 1)
+
+    t0 = time.perf_counter()
+    gmsh.model.mesh.generate(2)
+    elapsed = time.perf_counter() - t0
+
+    elem_types , elem_tags , _ = gmsh.model.mesh.getElements(2)
+    quad_tags  = np.hstack([ tags for et,tags in zip(elem_types,elem_tags) if et == 3 ] + [np.zeros(0)])
+    ntriangles = int(sum( np.shape(tags)[0] for et,tags in zip(elem_types,elem_tags) if et == 2 ))
+    qualities  = np.array(gmsh.model.mesh.getElementQualities(quad_tags.astype(int).tolist(),"minSICN")) \
+                 if np.shape(quad_tags)[0] > 0 else np.zeros(1)
+
+    return { "algorithm" : algorithm , "recombination" : recombination , "time" : elapsed ,
+             "nelements" : int(np.shape(quad_tags)[0]) , "ntriangles" : ntriangles ,
+             "min_quality" : float(np.min(qualities)) , "mean_quality" : float(np.mean(qualities)) }
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: try every candidate pair on the coarse proxy & pick the fastest acceptable one ----
+def tune_algorithms( topology , element_size , hole_element_size , mesh_parameters ):
+
+    coarsening = mesh_parameters.get("tuning_coarsening",tuning_defaults["tuning_coarsening"])
+    nrepeats   = mesh_parameters.get("tuning_repeats",3)
+    min_qual   = mesh_parameters.get("min_quality",tuning_defaults["min_quality"])
+    set_mesh_sizes( topology , coarsening*element_size , coarsening*hole_element_size )
+
+    results = []
+    for algorithm in mesh_parameters.get("tuning_algorithms",tuning_defaults["tuning_algorithms"]):
+        for recombination in mesh_parameters.get("tuning_recombinations",tuning_defaults["tuning_recombinations"]):
+            try:
+                runs = [ mesh_with( algorithm , recombination ) for rep in range(0,nrepeats) ]
+            except Exception as err: #gmsh raises a bare Exception when an algorithm fails
+                print('Tuning: {0} + {1} failed ({2})'.format(algorithm,recombination,err))
+                continue
+            runs[0]["time"] = min( run["time"] for run in runs ) #Best of the repeats
+            results.append(runs[0])
+            print('Tuning: {algorithm} + {recombination}: {time:.4f} s, {nelements} quads, {ntriangles} triangles, '
+                  'min/mean quality {min_quality:.3f}/{mean_quality:.3f}'.format(**runs[0]))
+
+    if len(results) == 0:
+        raise RuntimeError('Tuning: every candidate pair of algorithms failed on the coarse proxy')
+
+    #Fastest all-quad mesh meeting the quality (or the best quality if none does, flagged as such):
+    accepted = [res for res in results if res["ntriangles"] == 0 and res["min_quality"] >= min_qual]
+    if len(accepted) > 0:
+        selected = dict( min( accepted , key=lambda res: res["time"] ) , meets_quality=True )
+    else:
+        print('Tuning: WARNING, no candidate meets min_quality = {0}, keeping the best quality one'.format(min_qual))
+        selected = dict( max( results , key=lambda res: (res["ntriangles"] == 0 , res["min_quality"]) ) , meets_quality=False )
+
+    gmsh.model.mesh.clear()
+    return selected , results
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: key of the parameter family (geometry & sizes relative to the width, tuning settings)
+def parameter_family_key( geometry_parameters , mesh_parameters , element_size , hole_element_size ):
+
+    width  = geometry_parameters["total_width"]
+    family = { "type"              : geometry_parameters["type"].lower() ,
+               "hole_diameter"     : round( geometry_parameters["hole_diameter"]/width , 3 ) ,
+               "grip_length"       : round( geometry_parameters["grip_length"]/width , 3 ) ,
+               "alpha_ratio"       : round( geometry_parameters["lengthsratio_grip2holezone"] , 3 ) ,
+               "element_size"      : round( element_size/width , 3 ) ,
+               "hole_element_size" : round( hole_element_size/width , 3 ) ,
+               **{ key : mesh_parameters.get(key,default) for key , default in tuning_defaults.items() } }
+
+    return hashlib.sha1( json.dumps(family,sort_keys=True).encode() ).hexdigest() , family
+#·# -------------------------------------------------------------------------------------
+
+
+
+#-# Read input file with specimen parameters:
+inpfile = open(inpfilename)
+specimen_parameters = json.load(inpfile)
+
+
+#-# Parse input data and calculate geometry data:
+geometry_parameters = specimen_parameters["Geometry"]
+mesh_parameters     = specimen_parameters["Mesh"]
+
+topology = openhole_topology( geometry_parameters["total_width"] , geometry_parameters["hole_diameter"] ,
+                              geometry_parameters["grip_length"] , geometry_parameters["lengthsratio_grip2holezone"] ,
+                              mesh_parameters["nelements_transv"] , mesh_parameters["nelements_diag"] ,
+                              mesh_parameters["nelements_long_holezone"] , mesh_parameters["nelements_long_gripzone"])
+
+#Element sizes (by default, the same transversal density as the structured mesh):
+element_size      = mesh_parameters.get("element_size" , geometry_parameters["total_width"]/mesh_parameters["nelements_transv"])
+hole_element_size = mesh_parameters.get("hole_element_size" , element_size)
+tuning            = mesh_parameters.get("tuning","off") #Options: "off", "cached", "force"
+if tuning not in ["off","cached","force"]:
+    raise ValueError('Unknown tuning mode "{0}". Options: "off", "cached", "force"'.format(tuning))
+
+
+#-# Translate origin:
+topology["points"][:,0] += geometry_parameters["origin"][0] #Add X0
+topology["points"][:,1] += geometry_parameters["origin"][1] #Add Y0
+topology["points"][:,2] += geometry_parameters["origin"][2] #Add Z0
+
+
+#-# Initialize Geometric Model and Mesh Algorithm
 gmsh.initialize()
 gmsh.option.setNumber("General.Terminal", 1)
 gmsh.model.add('OpenHole')
 
-#Create points:
-pt_ids  = np.zeros(npoints,dtype=int)
-for pt in range(0,npoints):
-    pt_ids[pt] = gmsh.model.geo.addPoint(pcoords[pt,0],pcoords[pt,1],pcoords[pt,2])
-
-
-ca_ids      = np.zeros(ncirclearcs,dtype=int)
-for ca in range(0,ncirclearcs):
-    ca_ids[ca] = gmsh.model.geo.addCircleArc(ca_conect[ca,0],ca_conect[ca,1],ca_conect[ca,2])
-    #gmsh.model.geo.mesh.setTransfiniteCurve(ca_ids[ca],ca_conect[ca,3])
-
-ln_ids      = np.zeros(nlines,dtype=int)
-for ln in range(0,nlines):
-    ln_ids[ln] = gmsh.model.geo.addLine(ln_conect[ln,0],ln_conect[ln,1])
-    #gmsh.model.geo.mesh.setTransfiniteCurve(ln_ids[ln],ln_conect[ln,2]) 
-    
-
-aux_ids = [ [ln_ids] , [ca_ids] ]
-cl_ids = np.zeros(ncloops,dtype=int)
-for cl in range(0,ncloops):   
-    cl_connect_i = np.zeros(np.shape(cl_conect[cl]['entities_ids']),dtype='int')
-    idx_lns = cl_conect[cl]['geometry_types']==1 #Indexes for "line-type" curves
-    idx_cas = cl_conect[cl]['geometry_types']==2 #Indexes for "circle-arc-type" curves
-    cl_connect_i[idx_lns] = ln_ids[cl_conect[cl]['entities_ids'][idx_lns]-1]
-    cl_connect_i[idx_cas] = ca_ids[cl_conect[cl]['entities_ids'][idx_cas]-1]
-    #print( cl_connect_i )
-    cl_ids[cl] = gmsh.model.geo.addCurveLoop( cl_connect_i*cl_conect[cl]['signs'] )
-
-
-#Create surfaces
-#nsurfs = ncloops
-sf_ids = np.zeros(nsurfs,dtype=int)
-for sf in range(0,nsurfs): #try: in [2,3]:#   
-    sf_ids[sf] = gmsh.model.geo.addPlaneSurface( [sf_connect[sf]] )#[cl_ids[sf]] )
-
-#Assign surfaces a physical entity
-gmsh.model.addPhysicalGroup(2 , sf_ids )
-
-#Synchronize model 
-gmsh.model.geo.synchronize()
-
-#Set transfinite surfaces & recombine
-for sf in range(0,nsurfs):   
-    #gmsh.model.geo.mesh.setTransfiniteSurface(sf_ids[sf])
-    gmsh.model.geo.mesh.setRecombine(2, sf_ids[sf])
 
+#-# Create entities (no transfinite constraints):
+sf_ids = create_gmsh_entities( gmsh , topology , geometry_parameters["type"] , transfinite=False )
 
 
-#Synchronize model 
+#-# Assign the surfaces to be actually meshed a physical entity:
+gmsh.model.addPhysicalGroup( 2 , sf_ids )
 gmsh.model.geo.synchronize()
 
-gmsh.option.setNumber("Mesh.RecombineAll", 2)
-gmsh.model.mesh.generate(2)
-gmsh.model.mesh.setOrder(2)
-gmsh.option.setNumber('Mesh.SurfaceFaces', 1)
-gmsh.option.setNumber('Mesh.Points', 1)
-gmsh.write('open_hole2D.msh')
-gmsh.fltk.run()
-gmsh.finalize()
-
-
 
+#-# Select the algorithms (given, cached for the parameter family, or tuned on the coarse proxy):
+algorithm     = mesh_parameters.get("algorithm","frontal-delaunay")
+recombination = mesh_parameters.get("recombination","blossom")
+if tuning != "off":
+    family_key , family = parameter_family_key( geometry_parameters , mesh_parameters , element_size , hole_element_size )
+    cache = {}
+    if os.path.isfile(cachefilename):
+        with open(cachefilename) as f:
+            cache = json.load(f)
+
+    #Entries without the quality flag (older cache files) are tuned again:
+    cached = tuning == "cached" and "meets_quality" in cache.get(family_key,{}).get("selected",{})
+    if cached:
+        print('\nTuning: using the cached selection of this parameter family\n')
+        if not cache[family_key]["selected"]["meets_quality"]:
+            print('Tuning: WARNING, the cached selection does not meet min_quality = {0} (best quality fallback)'.format(
+                  cache[family_key]["family"]["min_quality"]))
+    else:
+        selected , results = tune_algorithms( topology , element_size , hole_element_size , mesh_parameters )
+        cache[family_key] = { "family" : family , "selected" : selected , "candidates" : results }
+        with open(cachefilename,'w') as f:
+            json.dump(cache,f,indent=1)
+
+    algorithm     = cache[family_key]["selected"]["algorithm"]
+    recombination = cache[family_key]["selected"]["recombination"]
+    print('\nTuning: selected {0} + {1}\n'.format(algorithm,recombination))
+
+
+#-# Perform meshing (full size)
+set_mesh_sizes( topology , element_size , hole_element_size )
+stats = mesh_with( algorithm , recombination )
+print('\nMeshed in {time:.2f} s: {nelements} quads, {ntriangles} triangles, min/mean quality {min_quality:.3f}/{mean_quality:.3f}\n'.format(**stats))
+gmsh.model.mesh.setOrder( mesh_parameters["elements_order"] )
+
+
+#-# Write mesh and run GUI
+write_gmsh_mesh( gmsh , specimen_parameters["General"]["output_file_name"]+'.msh' ,
+                 specimen_parameters["General"].get("run_gui",True) )
+gmsh.finalize()
@@ -1,15 +1,102 @@
 import numpy as np
 import meshio
+import json
+import os
 import sys
 
 original_stdout = sys.stdout #Original standard output
 
+#Assembly-ready sparsity pattern (shared with the 2D converter):
+sys.path.append( os.path.join( os.path.dirname(os.path.abspath(__file__)) , '..' , '..' , 'common' ) )
+from csr_pattern import compute_csr_pattern , expand_csr_to_dofs , write_csr_pattern
+
+#·# Inputs --------------------------------------------------------------------
+#Hard setting: Name of the input file with the Specimen's Mesh and Geometry parameters (optional)
+inpfilename = 'specimen_parameters.json'
+#------------------------------------------------------------------------------
+
+
+#·# Def: function to build the material frames of every element ------------------------
+def compute_material_orientations( layer_ids , ply_angles ):
+
+    #Rotation matrices for each ply (rows = local material axes 1,2,3 in global XYZ):
+    theta = np.deg2rad( np.asarray(ply_angles,dtype=float) )
+    rot_per_ply = np.zeros([np.shape(theta)[0],3,3])
+    rot_per_ply[:,0,0] =  np.cos(theta)  #Axis 1 (fiber direction)
+    rot_per_ply[:,0,1] =  np.sin(theta)
+    rot_per_ply[:,1,0] = -np.sin(theta)  #Axis 2 (in-plane transverse direction)
+    rot_per_ply[:,1,1] =  np.cos(theta)
+    rot_per_ply[:,2,2] =  1.0            #Axis 3 (through-the-thickness direction)
+
+    #Broadcast to elements (layer IDs start in 1):
+    idx_ply = np.asarray(layer_ids,dtype=int) - 1
+    orientations = np.zeros([np.shape(idx_ply)[0],10])
+    orientations[:,0]  = np.rad2deg( theta[idx_ply] )            #1st Column = Ply angle [deg]
+    orientations[:,1:] = rot_per_ply[idx_ply].reshape(-1,9)      #R11,R12,R13,R21,...,R33 (row-wise)
+
+    return orientations
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: function to insert zero-thickness cohesive elements between layers --------------
+def insert_cohesive_interfaces( connectivities , n_coords , interfaces ):
+
+    #Interface "i" lies between layers "i" and "i+1" (layer IDs in the 1st column, start in 1)
+    new_connect = connectivities.copy()
+    new_coords  = [ n_coords ]
+    nnodes      = np.shape(n_coords)[0]
+    coh_connect = []
+
+    for itf in interfaces:
+        idx_lower = new_connect[:,0] == itf
+        idx_upper = new_connect[:,0] == itf + 1
+
+        #Nodes shared by both layers (i.e. the nodes lying on the interface):
+        itf_nodes = np.intersect1d( new_connect[idx_lower,1:] , new_connect[idx_upper,1:] ).astype(int)
+
+        #Upper-layer elements having a face on the interface (9 nodes on it):
+        upper_con  = new_connect[idx_upper,1:].astype(int)
+        on_itf     = np.isin( upper_con , itf_nodes )
+        idx_facing = np.sum(on_itf,axis=1) == 9
+        face_nodes = upper_con[idx_facing][on_itf[idx_facing]].reshape(-1,9)
+
+        #Duplicate the interface nodes and rewire the upper layer onto the copies:
+        dup_ids = nnodes + 1 + np.arange(np.shape(itf_nodes)[0])
+        upper_con[on_itf] = dup_ids[ np.searchsorted(itf_nodes,upper_con[on_itf]) ]
+        new_connect[idx_upper,1:] = upper_con
+        new_coords.append( n_coords[itf_nodes-1] )
+        nnodes += np.shape(itf_nodes)[0]
+
+        #18-node interface elements: [lower face nodes, upper face nodes] with matching ordering
+        coh_i = np.zeros([np.shape(face_nodes)[0],19],dtype=int)
+        coh_i[:,0]     = itf  #1st Column = Interface ID
+        coh_i[:,1:10]  = face_nodes
+        coh_i[:,10:19] = dup_ids[ np.searchsorted(itf_nodes,face_nodes) ]
+        coh_connect.append(coh_i)
+
+    return new_connect , np.vstack(new_coords) , np.vstack(coh_connect)
+#·# -------------------------------------------------------------------------------------
+
 
 #·# Get & break down input data ----------------------------------------------------------
 inputfile= str(input('\nEnter .msh file name/path (include .msh extension): '))
 inputmsh = meshio.read(inputfile)
 n_coords = inputmsh.points                    #Nodal coordinates
 
+#Ply angles and cohesive interfaces of the stacking sequence (only if the specimen parameters are available):
+#(idem for the optional CSR sparsity pattern, node level and, if "dofs_per_node" is given, DOF level):
+ply_angles          = None
+cohesive_interfaces = []
+csr_export          = False
+dofs_per_node       = None
+if os.path.isfile(inpfilename):
+    with open(inpfilename) as inpfile:
+        specimen_parameters = json.load(inpfile)
+    ply_angles          = specimen_parameters["Geometry"].get("ply_angles")
+    cohesive_interfaces = specimen_parameters["Mesh"].get("cohesive_interfaces",[])
+    csr_export          = specimen_parameters["Mesh"].get("csr_pattern",False)
+    dofs_per_node       = specimen_parameters["Mesh"].get("dofs_per_node")
+
 
 
 connect_h27  = inputmsh.cells_dict["hexahedron27"] + 1 #Conectivities for 27-noded-hexahedrons
@@ -19,15 +106,36 @@ npe          = np.shape(connect_h27)[1]
 #Assemble connectivities matrix:
 connectivities = np.zeros([nelem,npe+1])
 connectivities[:,0] = (inputmsh.get_cell_data("gmsh:physical","hexahedron27")) + 1 #Layers type
-    
+
 #Reordering:
 idx_reord = [2,3,0,1,6,7,4,5,10,11,8,9,18,19,16,17,14,15,12,13,24,23,20,22,21,25,26]
-connectivities[:,1:] = connect_h27[:,idx_reord] 
+connectivities[:,1:] = connect_h27[:,idx_reord]
 
 #Check all elements have a material set:
 if (all(connectivities[:,0]==0)==False) != True:
     print('Some elements were not assigned a material set. Check')
-    
+
+#Material frames (same for all the Gauss points of an element, since plies are flat):
+if ply_angles is not None:
+    orientations = compute_material_orientations( connectivities[:,0] , ply_angles )
+
+#Cohesive interfaces (the nodes on the selected inter-ply surfaces are duplicated):
+if len(cohesive_interfaces) > 0:
+    connectivities , n_coords , coh_connectivities = insert_cohesive_interfaces( connectivities , n_coords , cohesive_interfaces )
+    print('\n'+18*'-'+' {0} 18-NODED COHESIVE ELEMENTS INSERTED '.format(np.shape(coh_connectivities)[0])+18*'-'+'\n')
+
+#CSR sparsity pattern & element scatter maps (cohesive elements also couple their nodes):
+if csr_export:
+    csr_connects = [ connectivities[:,1:].astype(np.int64) ]
+    csr_names    = [ 'Scatter' ]
+    if len(cohesive_interfaces) > 0:
+        csr_connects.append( coh_connectivities[:,1:].astype(np.int64) )
+        csr_names.append( 'Cohesive_Scatter' )
+    row_ptr , col_idx , scatters = compute_csr_pattern( csr_connects , np.shape(n_coords)[0] )
+    if dofs_per_node is not None:
+        dof_row_ptr , dof_col_idx , dof_scatters = expand_csr_to_dofs( row_ptr , col_idx , scatters , csr_connects , dofs_per_node )
+    print('\n'+18*'-'+' CSR PATTERN: {0} NODAL NONZEROS '.format(np.shape(col_idx)[0])+18*'-'+'\n')
+
 
 
 #·# WRITE OUTPUT (.m file)
@@ -36,14 +144,29 @@ with open('Connectivities_and_Coordinates_3D.m','w') as f:
     sys.stdout = f #Change the standard output to the file created
 
     np.set_printoptions( precision=20, threshold=sys.maxsize , suppress=1 , linewidth=1e3)
-    
+
     print('\nMODEL.Conectivity = ...')
     print(connectivities)
     print(';\n')
-    
+
     print('\nMODEL.Coordinates = ...')
     print(n_coords)
     print(';\n')
+
+    if ply_angles is not None:
+        print('\nMODEL.Orientation = ...') #[Ply angle, R11, R12, R13, R21, R22, R23, R31, R32, R33]
+        print(orientations)
+        print(';\n')
+
+    if len(cohesive_interfaces) > 0:
+        print('\nMODEL.Cohesive_Conectivity = ...') #[Interface ID, 9 lower-face nodes, 9 upper-face nodes]
+        print(coh_connectivities)
+        print(';\n')
+
+    if csr_export:
+        write_csr_pattern( f , 'MODEL.CSR' , row_ptr , col_idx , scatters , csr_names )
+        if dofs_per_node is not None:
+            write_csr_pattern( f , 'MODEL.CSR_DOF' , dof_row_ptr , dof_col_idx , dof_scatters , csr_names )
     #print("MODEL.Conectivity = [ (1:size(MODEL.Conectivity,1))' MODEL.Conectivity ];\n")
     #print("MODEL.Coordinates = [ (1:size(MODEL.Coordinates,1))' MODEL.Coordinates ];\n")
 
@@ -0,0 +1,186 @@
+###############################################################################
+#  Script to uniformly refine (h-refinement) an existing 2D or 3D open-hole   #
+# mesh, splitting every quad4/quad9 (hexa8/hexa27) element into 4 (8) nested #
+# children and keeping the new hole-boundary nodes on the hole circle         #
+###############################################################################
+
+import numpy as np
+import meshio
+import itertools
+import json
+import os
+import sys
+
+original_stdout = sys.stdout #Original standard output
+
+#Reference elements (meshio ordering) & Jacobians:
+sys.path.append( os.path.join( os.path.dirname(os.path.abspath(__file__)) , '..' , '..' , 'common' ) )
+from lagrange_elements import ref_nodes_meshio , jacobian_determinants
+
+#·# Inputs --------------------------------------------------------------------
+#Hard setting: Name of the input file with the Specimen's Mesh and Geometry parameters
+inpfilename = 'specimen_parameters.json'
+#------------------------------------------------------------------------------
+
+
+#·# Reference nodal positions (in the meshio ordering of the connectivities read, i.e. VTK
+#·# ordering for hexahedron27) & resorting indexes (same as the converters) for each element type:
+ref_nodes = ref_nodes_meshio
+resort_idx = { "quad"  : [0,1,2,3],
+               "quad9" : [0,4,1,5,2,6,3,7,8],
+               "hexahedron"   : [0,1,2,3,4,5,6,7],
+               "hexahedron27" : [2,3,0,1,6,7,4,5,10,11,8,9,18,19,16,17,14,15,12,13,24,23,20,22,21,25,26] }
+
+
+#·# Def: function to build the refinement tables of a reference element ------------------
+def compute_refinement_tables( ref_coords ):
+
+    ndim  = np.shape(ref_coords)[1]
+    npe   = np.shape(ref_coords)[0]
+    order = 1 if npe == 2**ndim else 2
+
+    #Lattice of the refined element (2*order+1 points per direction, integer coordinates):
+    nlat1d  = 2*order + 1
+    lattice = np.array(np.unravel_index(np.arange(nlat1d**ndim),[nlat1d]*ndim)).T
+    node_lattice = ((ref_coords + 1)*order).astype(int)  #Parent nodes lie on the even lattice points
+    lat2node = np.full([nlat1d]*ndim , -1 , dtype=int)
+    lat2node[tuple(node_lattice.T)] = np.arange(npe)
+
+    #Generators of each lattice point: parent nodes of the smallest even-lattice cell containing it
+    #(padded with index "npe", which points to a dummy zero column):
+    gen_local = np.full([np.shape(lattice)[0],2**ndim] , npe , dtype=int)
+    for lt in range(0,np.shape(lattice)[0]):
+        odd   = np.flatnonzero(lattice[lt] % 2)
+        combs = np.array(list(itertools.product([0,1],repeat=len(odd))),dtype=int).reshape(2**len(odd),len(odd))
+        corners = np.repeat(lattice[lt][None,:],np.shape(combs)[0],axis=0)
+        corners[:,odd] += 2*combs - 1
+        gen_local[lt,:np.shape(corners)[0]] = lat2node[tuple(corners.T)]
+
+    #Parent shape functions at the lattice points (tensor-product Lagrange polynomials):
+    nodes1d = np.linspace(-1,1,order+1)
+    xi_lat  = lattice/order - 1
+    shapefuncs = np.ones([np.shape(lattice)[0],npe])
+    for d in range(0,ndim):
+        for a in range(0,order+1):
+            others = np.delete(nodes1d,a)
+            l_a = np.prod( (xi_lat[:,d][:,None] - others[None,:]) / (nodes1d[a] - others[None,:]) , axis=1 )
+            shapefuncs[:, ref_coords[:,d] == nodes1d[a]] *= l_a[:,None]
+
+    #Lattice points of the nodes of each child (same local ordering as the parent):
+    offsets = np.array(np.unravel_index(np.arange(2**ndim),[2]*ndim)).T
+    child_lattice = offsets[:,None,:]*order + node_lattice[None,:,:]//2
+    child_local   = np.ravel_multi_index( tuple(np.moveaxis(child_lattice,2,0)) , [nlat1d]*ndim )
+
+    return gen_local , shapefuncs , child_local
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: function to perform one level of uniform refinement ------------------------------
+def refine_mesh( connect , ncoords , ref_coords , hole_center , hole_radius ):
+
+    nelem  = np.shape(connect)[0]
+    nnodes = np.shape(ncoords)[0]
+    gen_local , shapefuncs , child_local = compute_refinement_tables( ref_coords )
+    nlat   = np.shape(gen_local)[0]
+
+    #Global keys of every lattice point: sorted global IDs of its generators (0 = padding).
+    #Lattice points shared by neighbouring elements get the same key:
+    connect_ext = np.hstack(( connect , np.zeros([nelem,1],dtype=connect.dtype) ))
+    keys = np.sort( connect_ext[:,gen_local] , axis=2 ).reshape(nelem*nlat,-1)
+    ukeys , first_idx , inv_idx = np.unique( keys , axis=0 , return_index=True , return_inverse=True )
+    inv_idx = inv_idx.ravel()
+
+    #Existing nodes keep their IDs, new nodes are appended:
+    is_new  = ukeys[:,-2] != 0
+    new_ids = np.zeros(np.shape(ukeys)[0],dtype=connect.dtype)
+    new_ids[~is_new] = ukeys[~is_new,-1]
+    new_ids[is_new]  = nnodes + 1 + np.arange(np.count_nonzero(is_new))
+
+    #Coordinates of the new nodes (isoparametric map of the parent element):
+    elem_new = first_idx[is_new] // nlat
+    lat_new  = first_idx[is_new] %  nlat
+    xyz_new  = np.einsum( 'nk,nkd->nd' , shapefuncs[lat_new] , ncoords[connect[elem_new]-1] )
+
+    #Snap the new nodes generated only by hole-boundary nodes onto the hole circle:
+    r_old   = np.linalg.norm( ncoords[:,:2] - hole_center , axis=1 )
+    on_hole = np.append( False , np.abs(r_old - hole_radius) < 1e-6*hole_radius )
+    gens    = ukeys[is_new]
+    snap    = np.all( on_hole[gens] | (gens==0) , axis=1 )
+    r_new   = np.linalg.norm( xyz_new[snap,:2] - hole_center , axis=1 )
+    xyz_new[snap,:2] = hole_center + (xyz_new[snap,:2] - hole_center) * (hole_radius/r_new)[:,None]
+
+    #Children connectivities and parent map:
+    lattice_ids   = new_ids[inv_idx].reshape(nelem,nlat)
+    child_connect = lattice_ids[:,child_local].reshape(-1,np.shape(connect)[1])
+    parent_ids    = np.repeat( np.arange(nelem) , np.shape(child_local)[0] )
+
+    return child_connect , np.vstack(( ncoords , xyz_new )) , parent_ids
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Get & break down input data ----------------------------------------------------------
+inputfile = str(input('\nEnter .msh file name/path (include .msh extension): '))
+nlevels   = int(input('\nEnter number of refinement levels: '))
+inputmsh  = meshio.read(inputfile)
+
+inpfile = open(inpfilename)
+specimen_parameters = json.load(inpfile)
+hole_center = np.array(specimen_parameters["Geometry"]["origin"][:2],dtype=float)
+hole_radius = specimen_parameters["Geometry"]["hole_diameter"]/2
+
+#Detect element type (the highest dimension found):
+cell_type = [ct for ct in ["hexahedron27","hexahedron","quad9","quad"] if ct in inputmsh.cells_dict][0]
+connect   = inputmsh.cells_dict[cell_type] + 1   #pyth indices start in 0 & n°nod must start in 1
+ndim      = np.shape(ref_nodes[cell_type])[1]
+if ndim == 3:
+    tags = inputmsh.get_cell_data("gmsh:physical",cell_type) + 1 #Layers type
+else:
+    tags = np.ones(np.shape(connect)[0],dtype=int)              #Material ID
+
+print('\n'+18*'-'+' {0} {1} ELEMENTS DETECTED '.format(np.shape(connect)[0],cell_type.upper())+18*'-'+'\n')
+
+
+#·# Build the hierarchy of nested meshes ---------------------------------------------------
+levels = [ { "connect" : connect , "coords" : inputmsh.points , "tags" : tags , "parent" : None } ]
+for lv in range(0,nlevels):
+    child_connect , coords , parent_ids = refine_mesh( levels[-1]["connect"] , levels[-1]["coords"] ,
+                                                       ref_nodes[cell_type] , hole_center , hole_radius )
+    levels.append( { "connect" : child_connect , "coords" : coords ,
+                     "tags" : levels[-1]["tags"][parent_ids] , "parent" : parent_ids + 1 } )
+    print('Level {0}: {1} elements, {2} nodes'.format(lv+1,np.shape(child_connect)[0],np.shape(coords)[0]))
+
+    #Check that no child is tangled (Jacobian at the corners, with all the element nodes):
+    corners = ref_nodes[cell_type][ np.all(np.abs(ref_nodes[cell_type]) == 1,axis=1) ]
+    ninverted = np.count_nonzero( np.any( jacobian_determinants( child_connect , coords , ref_nodes[cell_type] , corners ) <= 0 , axis=1 ) )
+    if ninverted > 0:
+        raise RuntimeError('Level {0}: {1} children with non-positive corner Jacobians'.format(lv+1,ninverted))
+
+
+#·# WRITE OUTPUT (.m file)
+outfilename = 'Refined_Connectivities_and_Coordinates_{0}D.m'.format(ndim)
+print('\nWriting MATLAB .m file: '+outfilename+' , wait...\n')
+with open(outfilename,'w') as f:
+    sys.stdout = f #Change the standard output to the file created
+
+    np.set_printoptions( precision=20, threshold=sys.maxsize , suppress=1 , linewidth=1e3)
+
+    for lv in range(0,nlevels+1):
+        connectivities = np.zeros([np.shape(levels[lv]["connect"])[0],np.shape(levels[lv]["connect"])[1]+1])
+        connectivities[:,0]  = levels[lv]["tags"]                                #1st Column = Material/Layer ID
+        connectivities[:,1:] = levels[lv]["connect"][:,resort_idx[cell_type]]    #connectivities (w/Reordering)
+
+        print('\nMODEL.Level({0}).Conectivity = ...'.format(lv+1))
+        print(connectivities)
+        print(';\n')
+
+        print('\nMODEL.Level({0}).Coordinates = ...'.format(lv+1))
+        print(levels[lv]["coords"])
+        print(';\n')
+
+        if levels[lv]["parent"] is not None: #Parent element (in the previous level) of each element
+            print('\nMODEL.Level({0}).Parent = ...'.format(lv+1))
+            print(levels[lv]["parent"])
+            print(';\n')
+
+sys.stdout = original_stdout
+print('\nDone writing '+outfilename+'\n')
@@ -0,0 +1,120 @@
+###############################################################################
+#  Golden-mesh regression: runs the meshing pipeline for every case of the    #
+# matrix in regression_cases.json and compares the fingerprints of the        #
+# resulting meshes against the stored golden ones (golden/<case>.json/.npz)   #
+#                                                                             #
+#  Usage: python golden_mesh_regression.py [--update] [--cases-file FILE]     #
+#                                          [case names...]                    #
+###############################################################################
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from mesh_fingerprint import read_matlab_model , compute_fingerprint , compare_fingerprints
+
+#·# Inputs --------------------------------------------------------------------
+regression_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir       = os.path.dirname(regression_dir)
+casesfilename  = os.path.join(regression_dir,'regression_cases.json')
+golden_dir     = os.path.join(regression_dir,'golden')
+#------------------------------------------------------------------------------
+
+
+#·# Def: run the meshing pipeline of a case and return the .m output -------------------
+def run_case( case , workdir ):
+
+    #Input file of the mesher (GUI always off):
+    parameters = case["parameters"]
+    parameters["General"]["run_gui"] = False
+    with open(os.path.join(workdir,case.get("parameters_file","specimen_parameters.json")),'w') as f:
+        json.dump(parameters,f,indent=1)
+
+    #Mesher & (optional) converter, reading the .msh file name from the standard input:
+    subprocess.run( [sys.executable , os.path.join(repo_dir,case["mesher"])] , cwd=workdir , check=True ,
+                    stdout=subprocess.DEVNULL )
+    if case.get("converter") is not None:
+        subprocess.run( [sys.executable , os.path.join(repo_dir,case["converter"])] , cwd=workdir , check=True ,
+                        input=parameters["General"]["output_file_name"]+'.msh\n' , text=True , stdout=subprocess.DEVNULL )
+
+    return glob.glob(os.path.join(workdir,'Connectivities_and_Coordinates_*.m'))[0]
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Def: fingerprint the model written in a .m file ------------------------------------
+def fingerprint_file( mfilename , tol , rel_tol ):
+
+    arrays = read_matlab_model( mfilename )
+    return compute_fingerprint( arrays["Conectivity"] , arrays["Coordinates"] , tol , rel_tol )
+#·# -------------------------------------------------------------------------------------
+
+
+#·# Parse command line & read the cases matrix ----------------------------------------
+parser = argparse.ArgumentParser(description='Golden-mesh regression of the meshing scripts')
+parser.add_argument('cases',nargs='*',help='Names of the cases to run (default: all)')
+parser.add_argument('--update',action='store_true',help='Overwrite the golden fingerprints')
+parser.add_argument('--cases-file',default=casesfilename,help='JSON file with the cases matrix')
+args = parser.parse_args()
+
+with open(args.cases_file) as f:
+    cases = json.load(f)
+if len(args.cases) > 0:
+    cases = [case for case in cases if case["name"] in args.cases]
+
+
+#·# Run the cases ----------------------------------------------------------------------
+nfailed = 0
+for case in cases:
+    goldenfilename = os.path.join(golden_dir,case["name"]+'.json')
+    arraysfilename = os.path.join(golden_dir,case["name"]+'.npz')
+    golden = None
+    if os.path.isfile(goldenfilename) and not args.update:
+        with open(goldenfilename) as f:
+            golden = json.load(f)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            t0 = time.perf_counter()
+            mfilename = run_case( case , workdir )
+            t1 = time.perf_counter()
+            #Same rounding grid as the golden fingerprint, if any (else relative to the mesh extent):
+            fingerprint , canonical = fingerprint_file( mfilename , None if golden is None else golden["tolerance"] ,
+                                                        case.get("relative_tolerance",1e-6) )
+            t2 = time.perf_counter()
+        except (subprocess.CalledProcessError , IndexError , KeyError) as err:
+            print('[ERROR] {0}: pipeline failed ({1})'.format(case["name"],err))
+            nfailed += 1
+            continue
+
+    timing = '(meshing {0:.2f} s, fingerprint {1:.2f} s, {2} elements)'.format(t1-t0,t2-t1,fingerprint["nelements"])
+    if fingerprint["nonpositive_jacobians"] > 0:
+        print('[WARN]  {0}: {1} elements with non-positive Jacobians at the Gauss points'.format(case["name"],fingerprint["nonpositive_jacobians"]))
+
+    if args.update:
+        os.makedirs(golden_dir,exist_ok=True)
+        with open(goldenfilename,'w') as f:
+            json.dump(fingerprint,f,indent=1)
+        np.savez_compressed( arraysfilename , **canonical )
+        print('[SAVED] {0} {1}'.format(case["name"],timing))
+    elif golden is None or not os.path.isfile(arraysfilename):
+        nfailed += 1
+        print('[MISSING] {0}: no golden fingerprint (generate it with --update) {1}'.format(case["name"],timing))
+    else:
+        with np.load(arraysfilename) as npz:
+            differences = compare_fingerprints( fingerprint , golden , canonical , dict(npz) )
+        if len(differences) > 0:
+            nfailed += 1
+            print('[FAIL]  {0} {1}'.format(case["name"],timing))
+            for diff in differences:
+                print('          '+diff)
+        else:
+            print('[OK]    {0} {1}'.format(case["name"],timing))
+
+sys.exit( 1 if nfailed > 0 else 0 )
@@ -0,0 +1,133 @@
+###############################################################################
+#  Order-independent fingerprints of the meshes written by the converters    #
+# (MATLAB .m files), to detect silent changes of the geometry, the node      #
+# ordering (mid-nodes included) or the element orientation                   #
+###############################################################################
+
+import numpy as np
+import hashlib
+import os
+import re
+import sys
+
+#Reference elements & Jacobians:
+sys.path.append( os.path.join( os.path.dirname(os.path.abspath(__file__)) , '..' , 'common' ) )
+from lagrange_elements import ref_nodes_meshio , gauss_points , jacobian_determinants
+
+
+#-# Reference nodes in the converters' output ordering (by nodes per element) #
+#(the converters resort the meshio connectivities, e.g. "resortidx" & "idx_reord"):
+ref_nodes_out = { 4  : ref_nodes_meshio["quad"] ,
+                  9  : ref_nodes_meshio["quad9"][[0,4,1,5,2,6,3,7,8]] ,
+                  8  : ref_nodes_meshio["hexahedron"] ,
+                  27 : ref_nodes_meshio["hexahedron27"][[2,3,0,1,6,7,4,5,10,11,8,9,18,19,16,17,14,15,12,13,24,23,20,22,21,25,26]] }
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: read the arrays of a MATLAB .m file written by the meshing scripts - #
+def read_matlab_model( filename ):
+
+    with open(filename) as f:
+        text = f.read()
+
+    arrays = {}
+    for match in re.finditer( r'(\w+)\.(\w+) = (?:\.\.\.)?(.*?);' , text , re.S ):
+        body = match.group(3).strip()
+        if body.startswith('[['): #numpy-printed array (rows within brackets)
+            first_row = body[2:body.index(']')]
+        else:                     #plain rows (e.g. streamed output)
+            first_row = body.lstrip('[').strip().split('\n')[0]
+        ncols  = len(first_row.split())
+        values = np.fromstring( body.replace('[',' ').replace(']',' ') , sep=' ' )
+        arrays[match.group(2)] = values.reshape(-1,ncols) if ncols > 0 else values
+
+    return arrays
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: element measures (area/volume) and Jacobian determinants ----------- #
+def compute_element_measures( connect , ncoords ):
+
+    #Full (quad9/hexa27 included) isoparametric map, 3 Gauss points per direction:
+    ref_coords = ref_nodes_out[ np.shape(connect)[1] ]
+    gpoints , gweights = gauss_points( np.shape(ref_coords)[1] , 3 )
+    jacobs = jacobian_determinants( connect , ncoords , ref_coords , gpoints )
+
+    return jacobs @ gweights , jacobs
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: fingerprint of a mesh ---------------------------------------------- #
+#Coordinates are rounded to a grid of size "tol" (by default, about rel_tol times the bounding-box extent, so that
+#round-off changes of the meshing libraries do not change the fingerprint). Returns the fingerprint and the
+#canonical arrays (to be compared with a tolerance when the hashes differ):
+def compute_fingerprint( connectivities , ncoords , tol=None , rel_tol=1e-6 ):
+
+    tags    = connectivities[:,0].astype(np.int64)
+    connect = connectivities[:,1:].astype(np.int64)
+    if tol is None: #Power of 2, so that "round" coordinates (e.g. ply interfaces at 0.0625) lie on the grid, not halfway
+        tol = float( 2.0**np.floor( np.log2( rel_tol * np.max(np.ptp(ncoords,axis=0)) ) ) )
+
+    #Sorted coordinates (rounded to the tolerance) and canonical node numbering.
+    #Coincident nodes (e.g. duplicated at cohesive interfaces) share the same rank:
+    keys  = np.round( ncoords/tol ).astype(np.int64)
+    order = np.lexsort( keys.T[::-1] )
+    rank  = np.empty(np.shape(order)[0],dtype=np.int64)
+    rank[order] = np.cumsum( np.hstack(( 0 , np.any(np.diff(keys[order],axis=0) != 0,axis=1) )) )
+
+    #Canonical connectivities: node local ordering kept, elements sorted:
+    canon = np.column_stack(( tags , rank[connect-1] ))
+    canon = np.ascontiguousarray( canon[ np.lexsort( canon.T[::-1] ) ] )
+
+    #Per-layer measures and Jacobian signs:
+    measure , jacobs = compute_element_measures( connect , ncoords )
+    utags , inv_tags = np.unique( tags , return_inverse=True )
+
+    fingerprint = { "tolerance"             : tol ,
+                    "nodes_per_element"     : int(np.shape(connect)[1]) ,
+                    "nnodes"                : int(np.shape(ncoords)[0]) ,
+                    "nelements"             : int(np.shape(connect)[0]) ,
+                    "elements_per_tag"      : { str(tg) : int(n) for tg,n in zip(utags,np.bincount(inv_tags.ravel())) } ,
+                    "measure_per_tag"       : { str(tg) : float(m) for tg,m in zip(utags,np.bincount(inv_tags.ravel(),weights=measure)) } ,
+                    "coordinates_mean"      : np.mean(ncoords,axis=0).tolist() ,
+                    "coordinates_std"       : np.std(ncoords,axis=0).tolist() ,
+                    "coordinates_hash"      : hashlib.sha1( np.ascontiguousarray(keys[order]).tobytes() ).hexdigest() ,
+                    "connectivity_hash"     : hashlib.sha1( canon.tobytes() ).hexdigest() ,
+                    "nonpositive_jacobians" : int(np.count_nonzero( np.any(jacobs <= 0,axis=1) )) }
+
+    return fingerprint , { "coordinates" : keys[order] , "connectivity" : canon }
+
+#-# ------------------------------------------------------------------------- #
+
+
+#-# Def: compare a fingerprint (& canonical arrays) against the golden ones -- #
+#The hashes are only a fast path: when they differ, the canonical arrays are compared (coordinates
+#within one tolerance step, connectivities exactly):
+def compare_fingerprints( fingerprint , golden , canonical=None , golden_canonical=None , rtol=1e-9 ):
+
+    differences = []
+    for key in golden:
+        value , ref = fingerprint.get(key) , golden[key]
+        if key == "tolerance":
+            continue
+        elif key == "coordinates_hash" and value != ref and canonical is not None:
+            cur , gld = canonical["coordinates"] , golden_canonical["coordinates"]
+            same = np.shape(cur) == np.shape(gld) and np.max(np.abs(cur - gld),initial=0) <= 1
+        elif key == "connectivity_hash" and value != ref and canonical is not None:
+            same = np.array_equal( canonical["connectivity"] , golden_canonical["connectivity"] )
+        elif isinstance(ref,dict):
+            same = value is not None and set(value) == set(ref) and \
+                   all( np.isclose(value[k],ref[k],rtol=rtol) for k in ref )
+        elif isinstance(ref,list): #Coordinates statistics: within the tolerance
+            same = value is not None and np.allclose(value,ref,rtol=0,atol=golden["tolerance"])
+        else:
+            same = value == ref
+        if not same:
+            differences.append('{0}: got {1}, expected {2}'.format(key,value,ref))
+
+    return differences
+
+#-# ------------------------------------------------------------------------- #